@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from buffer import Buffer
+from component import ComponentType, ProductType
+from config import default_spec
+from event import INSPECTION, Event
+from fel import FEL_TYPES
+from inspector import Inspector
+from rng import ExpSampler, generate_exp
+from routing import OutputPolicy
+from system import LOG_DIR, System
+from tracing import FileTraceSink
+from workstation import Workstation
+
+# Where each run's results are kept, and compared against by the next run
+BASELINE_PATH = os.path.join(LOG_DIR, 'benchmark.json')
+# Relative slowdown, compared with the baseline, that counts as a regression
+THRESHOLD = 0.10
+# Simulated time of the macro-benchmark replications
+MACRO_END_TIME = 100000.0
+# Modules whose import time is measured: the simulator, and what every
+# replication worker process imports
+STARTUP_MODULES = ('system', 'runner')
+BENCHMARK_LAYERS = ('startup', 'micro', 'macro')
+
+
+def measure(fn, ops, repeat=5):
+    """
+    Call fn() repeat times and return the best rate in operations per
+    second, fn() performing `ops` operations per call.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return ops / best
+
+
+def bench_fel(kind, n=10000, size=1000):
+    """
+    FEL hold model: with `size` pending events, repeatedly take the earliest
+    and schedule a new one a random time after it.
+    """
+    rng = random.Random(1)
+    delays = [rng.expovariate(1.0) for _ in range(n)]
+
+    def run():
+        fel = FEL_TYPES[kind]()
+        for k in range(size):
+            fel.put(Event(delays[k], INSPECTION))
+        for d in delays:
+            event = fel.get()
+            event.time += d
+            fel.put(event)
+    return measure(run, n)
+
+
+def bench_generate_exp(n=100000):
+    rng = random.Random(1)
+    return measure(lambda: [generate_exp(0.1, rng) for _ in range(n)], n)
+
+
+def bench_exp_sampler(n=100000):
+    sampler = ExpSampler(random.Random(1))
+    return measure(lambda: [sampler.sample(0.1) for _ in range(n)], n)
+
+
+def bench_buffer(n=100000):
+    buffer = Buffer(ComponentType.C1, capacity=n)
+    c1 = ComponentType.C1
+
+    def run():
+        for _ in range(n):
+            buffer.enqueue(c1)
+        for _ in range(n):
+            buffer.dequeue()
+    return measure(run, 2 * n)
+
+
+def bench_routing(policy, stations, n=20000):
+    """
+    Routing decisions of one inspector feeding `stations` workstations,
+    alternating pushes to and pulls from the chosen buffer so the queue
+    lengths keep changing.
+    """
+    workstations = [Workstation(None, f'WS{k:03}', 1.0, [ComponentType.C1],
+                                ProductType.P1, capacities={
+                                    ComponentType.C1: 4})
+                    for k in range(stations)]
+    inspector = Inspector(None, 'IN1', {ComponentType.C1: 1.0},
+                          [ComponentType.C1], workstations, policy)
+    # Forward buffer changes to the policy's index, as the System does
+    for w in workstations:
+        w.buffers[ComponentType.C1].monitor = inspector.router.buffer_changed
+    c1 = ComponentType.C1
+
+    def run():
+        for k in range(n):
+            w = inspector.choose_output()
+            if w is not None and k % 3:
+                w.buffers[c1].enqueue(c1)
+                inspector.router.chosen(c1, w)
+            else:
+                b = workstations[k % stations].buffers[c1]
+                if not b.is_empty():
+                    b.dequeue()
+    return measure(run, n)
+
+
+def bench_system(trace=False, event_log=False, repeat=3):
+    """
+    Events per second of a full replication of the default model, run for
+    MACRO_END_TIME.
+    """
+    spec = default_spec().with_overrides({'end_time': MACRO_END_TIME})
+    with tempfile.TemporaryDirectory() as tmp:
+        best = float('inf')
+        events = 0
+        for _ in range(repeat):
+            sink = FileTraceSink(os.path.join(tmp, 'trace')) if trace \
+                else None
+            start = time.perf_counter()
+            system = System(0, sink, master_seed=1, spec=spec, log_dir=tmp,
+                            event_log=event_log)
+            system.run()
+            best = min(best, time.perf_counter() - start)
+            if sink is not None:
+                sink.close()
+            events = system.event_count
+    return events / best
+
+
+def bench_import(module, repeat=5):
+    """
+    Imports per second of a module in a fresh interpreter, timing the import
+    only, not the interpreter's own start-up.
+    """
+    code = ('import time; start = time.perf_counter(); '
+            f'import {module}; print(time.perf_counter() - start)')
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    best = float('inf')
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], cwd=src_dir,
+                             capture_output=True, text=True, check=True)
+        best = min(best, float(out.stdout))
+    return 1 / best
+
+
+def benchmarks(layers=BENCHMARK_LAYERS):
+    """
+    Return the benchmarks of the given layers as (name, function) pairs.
+    """
+    cases = list()
+    if 'startup' in layers:
+        for module in STARTUP_MODULES:
+            cases.append((f'import_{module}',
+                          lambda module=module: bench_import(module)))
+    if 'micro' in layers:
+        for kind in sorted(FEL_TYPES):
+            cases.append((f'fel_{kind}', lambda kind=kind: bench_fel(kind)))
+        cases.append(('generate_exp', bench_generate_exp))
+        cases.append(('exp_sampler', bench_exp_sampler))
+        cases.append(('buffer', bench_buffer))
+        for policy in OutputPolicy:
+            for stations in (3, 30):
+                cases.append((
+                    f'routing_{policy.name.lower()}_{stations}',
+                    lambda p=policy, s=stations: bench_routing(p, s)))
+    if 'macro' in layers:
+        cases.append(('system_headless', bench_system))
+        cases.append(('system_log',
+                      lambda: bench_system(event_log=True)))
+        cases.append(('system_trace_log',
+                      lambda: bench_system(trace=True, event_log=True)))
+    return cases
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Return the names of the benchmarks more than `threshold` slower than in
+    the baseline, with their current/baseline rate ratios.
+    """
+    regressions = dict()
+    for name, rate in results.items():
+        base = baseline.get(name)
+        if base and rate < base * (1 - threshold):
+            regressions[name] = rate / base
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark the simulation engine and compare with the '
+        'previous run.')
+    parser.add_argument('--layers', nargs='+', choices=BENCHMARK_LAYERS,
+                        default=list(BENCHMARK_LAYERS),
+                        help='benchmark layers to run (default: all)')
+    parser.add_argument('--baseline', default=BASELINE_PATH, metavar='PATH',
+                        help='JSON results of the previous run, replaced by '
+                        'this one unless it has regressions (default: '
+                        f'{BASELINE_PATH})')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='relative slowdown reported as a regression '
+                        f'(default: {THRESHOLD})')
+    parser.add_argument('--no-save', dest='save', action='store_false',
+                        help='do not replace the baseline with this run')
+    parser.add_argument('--accept', action='store_true',
+                        help='replace the baseline even if there are '
+                        'regressions')
+    args = parser.parse_args()
+
+    baseline = dict()
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    results = dict()
+    for name, fn in benchmarks(args.layers):
+        results[name] = fn()
+        line = f'{name:<28} {results[name]:>14,.0f} ops/s'
+        if name.startswith('import_'):
+            line += f'  {1000 / results[name]:.1f} ms'
+        if name in baseline:
+            line += f'  ({results[name] / baseline[name] - 1:+.1%})'
+        print(line)
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, ratio in regressions.items():
+        print(f'REGRESSION: {name} is {1 - ratio:.1%} slower than the '
+              'baseline')
+
+    if regressions and not args.accept:
+        print('Baseline kept; rerun with --accept to replace it')
+    elif args.save:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                # Benchmarks not run this time keep their previous results
+                'results': {**baseline, **results},
+            }, f, indent=2)
+    sys.exit(1 if regressions else 0)
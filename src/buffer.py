@@ -1,45 +1,61 @@
 from component import ComponentType
 
+# Default buffer capacity
 BUFFER_MAX_SIZE = 2
 
 class Buffer:
     """
     Queue-like buffer that stores components.
+
+    A buffer only ever holds components of its own type, and components of
+    one type are interchangeable, so only their number is kept: every
+    operation is O(1) whatever the capacity.
     """
-    def __init__(self, type:ComponentType):
+    __slots__ = ('component_type', 'capacity', 'count', 'monitor', 'index')
+
+    def __init__(self, type:ComponentType, capacity=BUFFER_MAX_SIZE):
         self.component_type = type
-        self.contents = list()
+        self.capacity = capacity
+        self.count = 0
+        # Optional callback, called with this buffer after every change, e.g.
+        # to keep time-weighted occupancy statistics
+        self.monitor = None
+        # Position in the CompiledModel's buffer list
+        self.index = None
 
 
     def enqueue(self, type:ComponentType):
-        if not type == self.component_type:
+        if type is not self.component_type:
             raise BufferException('Incorrect component type')
 
-        if self.is_full():
+        if self.count >= self.capacity:
             raise BufferException('Cannot push to a full buffer')
 
-        self.contents.append(type)
+        self.count += 1
+        if self.monitor is not None:
+            self.monitor(self)
 
 
     def dequeue(self):
-        if self.is_empty():
+        if self.count == 0:
             raise BufferException('Cannot pop from empty buffer')
-        else:
-            # Get the oldest element
-            return self.contents.pop(0)
+        self.count -= 1
+        if self.monitor is not None:
+            self.monitor(self)
+        return self.component_type
 
 
     def is_full(self):
-        return len(self.contents) == BUFFER_MAX_SIZE
-    
+        return self.count >= self.capacity
+
 
     def is_empty(self):
-        return len(self.contents) == 0
+        return self.count == 0
 
 
     def get_length(self):
-        return len(self.contents)
+        return self.count
 
 
 class BufferException(Exception):
-    pass
\ No newline at end of file
+    pass
@@ -0,0 +1,270 @@
+import argparse
+import gzip
+import pickle
+
+from config import ModelSpec, default_spec, load_spec, parse_override
+from event import END
+from kpi import TimeWeightedStat
+from system import System
+
+# Bumped whenever the layout of the state dict changes
+CHECKPOINT_VERSION = 1
+
+
+class CheckpointException(Exception):
+    pass
+
+
+def capture(system):
+    """
+    Return the complete dynamic state of a System, between two events, as a
+    plain dict of picklable values: the model spec, the pending events, the
+    buffers, workstations and inspectors, the blocked list and subscriptions,
+    the KPI accumulators and the state of every random stream.
+
+    Only the simulation itself is captured: trace sinks, the CSV log and the
+    state recorder are outputs, which a restored System starts afresh.
+    """
+    if system.wakeups:
+        raise CheckpointException('Cannot checkpoint in the middle of an '
+                                  'event')
+    model = system.model
+    return {
+        'version': CHECKPOINT_VERSION,
+        'spec': system.spec.to_dict(),
+        'replication_id': system.replication_id,
+        'master_seed': system.streams.master_seed,
+        'antithetic': system.antithetic,
+        'warmup': system.warmup,
+        'clock': system.clock,
+        'event_count': system.event_count,
+        'running': system.running,
+        'events': [(e.time, e.kind, e.index)
+                   for e in system.event_list.snapshot()],
+        'buffers': [b.count for b in model.buffers],
+        'workstations': [{
+            'busy': w.busy,
+            'rng': w.rng.getstate(),
+            'sampler': _sampler_state(w.sampler),
+        } for w in model.workstations],
+        'inspectors': [{
+            'component': i.component.name,
+            'time_blocked': i.time_blocked,
+            'blocked_since': i.blocked_since,
+            'rng': i.rng.getstate(),
+            'choice_rng': i.choice_rng.getstate(),
+            'sampler': _sampler_state(i.sampler),
+            'router': i.router.get_state(),
+        } for i in model.inspectors],
+        'blocked': [i.index for i in system.blocked_inspectors],
+        'waiting': [[i.index for i in w] for w in system.waiting],
+        'products_made': list(system.products_made),
+        'kpi': {
+            'start_time': system.kpi.start_time,
+            'products_offset': list(system.kpi.products_offset),
+            'blocked_offset': list(system.kpi.blocked_offset),
+            'queue': [_stat_state(s) for s in system.kpi.queue],
+            'busy': [_stat_state(s) for s in system.kpi.busy],
+            'blocked': [_stat_state(s) for s in system.kpi.blocked],
+        },
+        'kpis': system.kpis,
+    }
+
+
+def restore(system, state):
+    """
+    Overwrite the dynamic state of a freshly built System with a captured
+    state. The System's spec may differ from the captured one in rates,
+    capacities, routing or run length, but must have the same entities.
+    """
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise CheckpointException('Unsupported checkpoint version '
+                                  f"{state.get('version')}")
+    model = system.model
+    if (len(state['buffers']) != len(model.buffers)
+            or len(state['workstations']) != len(model.workstations)
+            or len(state['inspectors']) != len(model.inspectors)):
+        raise CheckpointException('Checkpoint does not match the model')
+    if state['clock'] >= system.spec.end_time:
+        raise CheckpointException('Checkpoint is past the end of the run')
+
+    system.clock = state['clock']
+    system.event_count = state.get('event_count', 0)
+    system.running = state['running']
+
+    # Rebuild the event list. Events come back in processing order, so ties
+    # keep their order; the end of the run follows the System's own spec.
+    system.event_list = type(system.event_list)()
+    for time, kind, index in state['events']:
+        if kind != END:
+            system.schedule_event(
+                system.event_pool.acquire(time, kind, index))
+    system.schedule_event(
+        system.event_pool.acquire(system.spec.end_time, END))
+
+    for b, count in zip(model.buffers, state['buffers']):
+        if count > b.capacity:
+            raise CheckpointException('Checkpoint overfills buffer '
+                                      f'{model.buffer_names[b.index]}')
+        b.count = count
+    for w, s in zip(model.workstations, state['workstations']):
+        w.busy = s['busy']
+        w.rng.setstate(s['rng'])
+        _restore_sampler(w.sampler, s['sampler'])
+    for i, s in zip(model.inspectors, state['inspectors']):
+        i.component = type(i.component)[s['component']]
+        i.time_blocked = s['time_blocked']
+        i.blocked_since = s['blocked_since']
+        i.rng.setstate(s['rng'])
+        i.choice_rng.setstate(s['choice_rng'])
+        _restore_sampler(i.sampler, s['sampler'])
+        i.router.set_state(s['router'])
+
+    system.blocked_inspectors = [model.inspectors[n]
+                                 for n in state['blocked']]
+    system.waiting = [[model.inspectors[n] for n in w]
+                      for w in state['waiting']]
+    system.products_made = list(state['products_made'])
+
+    kpi = system.kpi
+    kpi.start_time = state['kpi']['start_time']
+    kpi.products_offset = list(state['kpi']['products_offset'])
+    kpi.blocked_offset = list(state['kpi'].get(
+        'blocked_offset', [0.0] * len(model.inspectors)))
+    kpi.queue = [_restore_stat(s) for s in state['kpi']['queue']]
+    kpi.busy = [_restore_stat(s) for s in state['kpi']['busy']]
+    kpi.blocked = [_restore_stat(s) for s in state['kpi']['blocked']]
+    system.kpis = state['kpis']
+
+    # Blocked inspectors retry their push, in the order they were blocked:
+    # in a fork with larger buffers, or another routing policy, they may no
+    # longer be blocked. Those that still are wait again as before.
+    for w in system.waiting:
+        w.clear()
+    system.wakeups.extend(system.blocked_inspectors)
+    system.wake_inspectors()
+
+    # The state table starts again from the restored state
+    if system.recorder is not None:
+        system.recorder.rows = 0
+        system.record_state()
+
+
+def save_checkpoint(system, path):
+    """
+    Write the state of a System to a gzipped pickle.
+    """
+    with gzip.open(path, 'wb') as f:
+        pickle.dump(capture(system), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_state(path):
+    """
+    Read a checkpoint written by save_checkpoint(). Like any pickle, only
+    load checkpoints from trusted sources.
+    """
+    with gzip.open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def load_checkpoint(path, spec=None, **options):
+    """
+    Build a System that carries on from a checkpoint. spec defaults to the
+    checkpointed model; passing a variant forks the warmed-up state into a
+    different scenario. options are passed on to System (trace, exports,
+    log_dir, fel, ...); the random streams are fixed by the checkpoint, so
+    master_seed, antithetic and vectorized_rng may only repeat its values.
+    """
+    state = load_state(path)
+    if spec is None:
+        spec = ModelSpec(state['spec'])
+    fixed = {
+        'master_seed': state['master_seed'],
+        'antithetic': state['antithetic'],
+        'vectorized_rng': _uses_samplers(state),
+    }
+    for key, value in fixed.items():
+        if key in options and options.pop(key) != value:
+            raise CheckpointException(f'{key} is fixed by the checkpoint '
+                                      f'({value})')
+    options.setdefault('warmup', state['warmup'])
+    system = System(state['replication_id'], spec=spec, **fixed, **options)
+    restore(system, state)
+    return system
+
+
+def _uses_samplers(state):
+    return any(e['sampler'] is not None
+               for e in state['workstations'] + state['inspectors'])
+
+
+def _sampler_state(sampler):
+    if sampler is None:
+        return None
+    return (sampler.state.get_state(), list(sampler.block), sampler.pos)
+
+
+def _restore_sampler(sampler, state):
+    if (sampler is None) != (state is None):
+        raise CheckpointException('Checkpoint and System disagree on '
+                                  'vectorized_rng')
+    if sampler is not None:
+        rng_state, block, pos = state
+        sampler.state.set_state(rng_state)
+        sampler.block = list(block)
+        sampler.pos = pos
+
+
+def _stat_state(stat):
+    return (stat.value, stat.last_time, stat.start_time, stat.area)
+
+
+def _restore_stat(state):
+    stat = TimeWeightedStat()
+    stat.value, stat.last_time, stat.start_time, stat.area = state
+    return stat
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Save a replication part way through, or carry on from a '
+        'saved checkpoint.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    save = commands.add_parser('save', help='run a replication up to a time '
+                               'and save its state')
+    save.add_argument('at', type=float, help='clock time to stop at')
+    save.add_argument('out', help='checkpoint file to write')
+    save.add_argument('--model', default=None, metavar='PATH',
+                      help='model spec (default: the built-in model)')
+    save.add_argument('--replication', type=int, default=0,
+                      help='replication id (default: 0)')
+    save.add_argument('--seed', type=int, default=None,
+                      help='master seed (default: random)')
+    resume = commands.add_parser('resume', help='run a checkpoint to the end')
+    resume.add_argument('checkpoint', help='checkpoint file to read')
+    resume.add_argument('--model', default=None, metavar='PATH',
+                        help='model variant to fork into (default: the '
+                        'checkpointed model)')
+    resume.add_argument('--set', nargs='+', default=list(), dest='overrides',
+                        metavar='PATH=VALUE',
+                        help='parameters to change in the fork, e.g. '
+                        'end_time=5000')
+    args = parser.parse_args()
+
+    if args.command == 'save':
+        spec = load_spec(args.model) if args.model else default_spec()
+        system = System(args.replication, master_seed=args.seed, spec=spec)
+        system.run_until(args.at)
+        save_checkpoint(system, args.out)
+        print(f'State at clock {system.clock} saved to {args.out}')
+    else:
+        if args.model:
+            spec = load_spec(args.model)
+        else:
+            spec = ModelSpec(load_state(args.checkpoint)['spec'])
+        spec = spec.with_overrides(
+            dict(parse_override(o) for o in args.overrides))
+        system = load_checkpoint(args.checkpoint, spec)
+        system.run()
+        for name, value in system.summary().items():
+            print(f'{name}: {value}')
@@ -0,0 +1,283 @@
+import copy
+import json
+import os
+
+from buffer import BUFFER_MAX_SIZE
+from component import ComponentType, ProductType
+from routing import OutputPolicy
+
+# The plant as originally specified for the project
+DEFAULT_MODEL = {
+    'end_time': 1000.0,
+    'buffer_capacity': BUFFER_MAX_SIZE,
+    'workstations': [
+        {'id': 'WS1', 'lambda': 0.2172, 'inputs': ['C1'], 'output': 'P1'},
+        {'id': 'WS2', 'lambda': 0.09015, 'inputs': ['C1', 'C2'],
+         'output': 'P2'},
+        {'id': 'WS3', 'lambda': 0.1137, 'inputs': ['C1', 'C3'],
+         'output': 'P3'},
+    ],
+    'inspectors': [
+        {'id': 'IN1', 'lambdas': {'C1': 0.0965},
+         'outputs': ['WS1', 'WS2', 'WS3'], 'routing': 'NAIVE'},
+        {'id': 'IN2', 'lambdas': {'C2': 0.0644, 'C3': 0.0485},
+         'outputs': ['WS2', 'WS3'], 'routing': 'NAIVE'},
+    ],
+}
+
+# Keys a model spec may have at each level
+MODEL_KEYS = ('end_time', 'buffer_capacity', 'workstations', 'inspectors')
+WORKSTATION_KEYS = ('id', 'lambda', 'inputs', 'output', 'buffer_capacity')
+INSPECTOR_KEYS = ('id', 'lambdas', 'outputs', 'routing')
+# Keys that can be left out, and so may be created by an override
+OPTIONAL_KEYS = ('buffer_capacity', 'routing')
+
+
+class WorkstationSpec:
+    def __init__(self, id, lam, inputs: list, output: ProductType,
+                 capacities: dict):
+        self.id = id
+        self.lam = lam
+        self.inputs = inputs
+        self.output = output
+        # Buffer capacity for each input component type
+        self.capacities = capacities
+
+
+class InspectorSpec:
+    def __init__(self, id, lambdas: dict, outputs: list,
+                 routing: OutputPolicy):
+        self.id = id
+        # Maps each component type this inspector handles to its lambda
+        self.lambdas = lambdas
+        self.inputs = list(lambdas.keys())
+        # IDs of the workstations this inspector can output to, in order
+        self.outputs = outputs
+        self.routing = routing
+
+
+class ModelSpec:
+    """
+    Validated description of a plant: its workstations, inspectors, rates,
+    buffer capacities, routing policies and run length.
+
+    A spec is built once (see load_spec) and then only read, so the same
+    object can be handed to every replication and every worker process.
+    """
+
+    def __init__(self, data):
+        data = copy.deepcopy(data)
+        self.data = data
+
+        _check_keys(data, MODEL_KEYS, 'model')
+        self.end_time = _positive(data, 'end_time', 'model')
+        default_capacity = data.get('buffer_capacity', BUFFER_MAX_SIZE)
+        _check_capacity(default_capacity, 'model')
+
+        self.workstations = list()
+        stations = dict()
+        for w in _list(data, 'workstations', 'model'):
+            ws_id = _id(w, stations, 'workstation')
+            where = f'workstation {ws_id}'
+            _check_keys(w, WORKSTATION_KEYS, where)
+            inputs = [_enum(ComponentType, c, where)
+                      for c in _list(w, 'inputs', where)]
+            if len(set(inputs)) != len(inputs):
+                raise ModelConfigError(f'{where}: duplicate input types')
+            capacities = _capacities(w.get('buffer_capacity', default_capacity),
+                                     default_capacity, inputs, where)
+            spec = WorkstationSpec(ws_id, _positive(w, 'lambda', where), inputs,
+                                   _enum(ProductType, w.get('output'), where),
+                                   capacities)
+            stations[ws_id] = spec
+            self.workstations.append(spec)
+
+        self.inspectors = list()
+        seen = dict()
+        for i in _list(data, 'inspectors', 'model'):
+            ins_id = _id(i, seen, 'inspector')
+            where = f'inspector {ins_id}'
+            _check_keys(i, INSPECTOR_KEYS, where)
+            lambdas = i.get('lambdas')
+            if not isinstance(lambdas, dict) or not lambdas:
+                raise ModelConfigError(f'{where}: lambdas must map component '
+                                       'types to rates')
+            lambdas = {_enum(ComponentType, c, where): _positive(lambdas, c, where)
+                       for c in lambdas}
+            outputs = _list(i, 'outputs', where)
+            for ws_id in outputs:
+                if ws_id not in stations:
+                    raise ModelConfigError(
+                        f'{where}: unknown workstation {ws_id}')
+            for c in lambdas:
+                if not any(c in stations[ws_id].inputs for ws_id in outputs):
+                    raise ModelConfigError(
+                        f'{where}: no output workstation accepts {c.name}')
+            routing = _enum(OutputPolicy, i.get('routing', 'NAIVE'), where)
+            spec = InspectorSpec(ins_id, lambdas, outputs, routing)
+            seen[ins_id] = spec
+            self.inspectors.append(spec)
+
+    def to_dict(self):
+        """
+        Return the plain (JSON-compatible) form of this spec.
+        """
+        return copy.deepcopy(self.data)
+
+    def with_overrides(self, overrides):
+        """
+        Return a new, validated spec with some parameters replaced.
+        overrides maps dotted paths to values; workstations and inspectors are
+        addressed by ID, e.g. 'end_time', 'buffer_capacity',
+        'workstations.WS1.lambda', 'workstations.WS2.buffer_capacity.C1',
+        'inspectors.IN2.lambdas.C3' or 'inspectors.IN1.routing'.
+        """
+        data = self.to_dict()
+        for path, value in overrides.items():
+            _set_path(data, path, value)
+        return ModelSpec(data)
+
+    def cost(self):
+        """
+        Rough relative cost of one replication: the expected number of
+        events, from the run length and the service rates.
+        """
+        rate = sum(w.lam for w in self.workstations)
+        for i in self.inspectors:
+            rate += sum(i.lambdas.values()) / len(i.lambdas)
+        return self.end_time * rate
+
+
+class ModelConfigError(Exception):
+    pass
+
+
+def default_spec():
+    return ModelSpec(DEFAULT_MODEL)
+
+
+def load_spec(path):
+    """
+    Load and validate a model spec from a .json or .toml file.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.toml':
+        import tomllib
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    elif ext == '.json':
+        with open(path) as f:
+            data = json.load(f)
+    else:
+        raise ModelConfigError(f'Unsupported model file type: {path}')
+    return ModelSpec(data)
+
+
+def parse_override(text):
+    """
+    Parse a command line override 'path=value' into (path, value). The value
+    is read as JSON if it can be, e.g. 5, 0.25 or [1, 2], and as a plain
+    string otherwise, e.g. SHORTEST_QUEUE.
+    """
+    path, _, value = text.partition('=')
+    try:
+        return path, json.loads(value)
+    except json.JSONDecodeError:
+        return path, value
+
+
+def _set_path(data, path, value):
+    keys = path.split('.')
+    node = data
+    # Whether node is a map of per-component values (lambdas or
+    # buffer_capacity), whose keys are checked when the spec is validated
+    nested = False
+    for key in keys[:-1]:
+        if isinstance(node, list):
+            node = next((e for e in node if e.get('id') == key), None)
+            if node is None:
+                raise ModelConfigError(f'{path}: no entity with id {key}')
+            nested = False
+        elif isinstance(node, dict):
+            if key not in node:
+                if nested or key not in OPTIONAL_KEYS:
+                    raise ModelConfigError(f'{path}: unknown parameter {key}')
+                node[key] = dict()
+            node = node[key]
+            nested = isinstance(node, dict)
+        else:
+            raise ModelConfigError(f'{path}: cannot set a value inside {key}')
+    if not isinstance(node, dict):
+        raise ModelConfigError(f'{path}: does not name a model parameter')
+    key = keys[-1]
+    if key not in node and not nested and key not in OPTIONAL_KEYS:
+        raise ModelConfigError(f'{path}: unknown parameter {key}')
+    node[key] = value
+
+
+def _check_keys(data, allowed, where):
+    if not isinstance(data, dict):
+        raise ModelConfigError(f'{where}: must be a table of parameters')
+    unknown = [key for key in data if key not in allowed]
+    if unknown:
+        raise ModelConfigError(f"{where}: unknown parameter(s) "
+                               f"{', '.join(map(str, unknown))}")
+
+
+def _list(data, key, where):
+    value = data.get(key)
+    if not isinstance(value, list) or not value:
+        raise ModelConfigError(f'{where}: {key} must be a non-empty list')
+    return value
+
+
+def _id(data, seen, kind):
+    value = data.get('id')
+    if not isinstance(value, str) or not value:
+        raise ModelConfigError(f'Every {kind} needs an id string')
+    if value in seen:
+        raise ModelConfigError(f'Duplicate {kind} id {value}')
+    return value
+
+
+def _positive(data, key, where):
+    value = data.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) \
+            or value <= 0:
+        raise ModelConfigError(f'{where}: {key} must be a positive number')
+    return float(value)
+
+
+def _enum(enum, name, where):
+    try:
+        return enum[name]
+    except (KeyError, TypeError):
+        choices = ', '.join(e.name for e in enum)
+        raise ModelConfigError(
+            f'{where}: {name!r} is not one of {choices}') from None
+
+
+def _check_capacity(value, where):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ModelConfigError(
+            f'{where}: buffer capacities must be positive integers')
+
+
+def _capacities(value, default, inputs, where):
+    """
+    Expand a buffer_capacity setting (one number, or one per component type
+    with `default` for the rest) into a capacity for every input.
+    """
+    if isinstance(value, dict):
+        capacities = dict()
+        for name, cap in value.items():
+            comp = _enum(ComponentType, name, where)
+            if comp not in inputs:
+                raise ModelConfigError(f'{where}: no {name} buffer')
+            _check_capacity(cap, where)
+            capacities[comp] = cap
+        for comp in inputs:
+            capacities.setdefault(comp, default)
+        return capacities
+    _check_capacity(value, where)
+    return {comp: value for comp in inputs}
@@ -1,36 +1,50 @@
 
-class Event():
-    def __init__(self, time):
-        self.time = time
-
-    # Custom comparison operators to allow sorting events based on their time
-    # This makes it easy to use them in a PriorityQueue
-    def __eq__(self, other):
-        return self.time == other.time
-
-    def __lt__(self, other):
-        return self.time < other.time
-
-    def __gt__(self, other):
-        return self.time > other.time
-
-
+# Event kinds. These index System's table of event handlers, so they must stay
+# dense and start at 0.
+INSPECTION = 0
+ASSEMBLY = 1
+END = 2
+WARMUP = 3
 
-class EndInspectionEvent(Event):
-    def __init__(self, time, id):
-        super().__init__(time)
-        self.id = id
 
-
-
-class EndAssemblyEvent(Event):
-    def __init__(self, time, id):
-        super().__init__(time)
-        self.id = id
-
-
-    
-class EndSimulationEvent(Event):
-    def __init__(self, time):
-        super().__init__(time)
-        self.id = 'END'
\ No newline at end of file
+class Event():
+    """
+    A scheduled event: when it happens, what kind of event it is and the index
+    of the inspector or workstation it belongs to.
+    Slotted, so events carry no per-instance __dict__.
+    """
+    __slots__ = ('time', 'kind', 'index')
+
+    def __init__(self, time, kind, index=0):
+        self.time = time
+        self.kind = kind
+        self.index = index
+
+
+
+class EventPool():
+    """
+    Free list of Event objects. Events that have been processed are released
+    back to the pool and reused by the next acquire(), so a long run does not
+    allocate a new object for every event it schedules.
+    """
+    __slots__ = ('free',)
+
+    def __init__(self):
+        self.free = list()
+
+    def acquire(self, time, kind, index=0):
+        if self.free:
+            event = self.free.pop()
+            event.time = time
+            event.kind = kind
+            event.index = index
+            return event
+        return Event(time, kind, index)
+
+    def release(self, event):
+        """
+        Return an event to the pool. The event must no longer be referenced by
+        the future event list.
+        """
+        self.free.append(event)
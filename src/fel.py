@@ -0,0 +1,225 @@
+from bisect import insort
+import heapq
+from itertools import count
+
+
+class FutureEventList:
+    """
+    Interface for the future event list (FEL).
+
+    Events come out in order of time; events with the same time come out in
+    the order they were scheduled. put() returns a handle that can be passed
+    to cancel(), which removes the event in O(1) by marking it dead; dead
+    entries are skipped when they reach the front of the list. Cancelling an
+    event that has already been processed does nothing.
+
+    Entries are [time, sequence number, event] lists, so ordering never falls
+    back to comparing the events themselves.
+    """
+
+    def __init__(self):
+        self.counter = count()
+        # Number of live (not cancelled) events
+        self.size = 0
+
+    def put(self, event):
+        """
+        Schedule an event and return its handle.
+        """
+        raise NotImplementedError
+
+    def get(self):
+        """
+        Remove and return the earliest live event.
+        """
+        raise NotImplementedError
+
+    def peek(self):
+        """
+        Return the earliest live event without removing it, or None if the
+        list is empty.
+        """
+        raise NotImplementedError
+
+    def cancel(self, handle):
+        """
+        Cancel a previously scheduled event. Cancelling twice does nothing.
+        """
+        if handle[2] is not None:
+            handle[2] = None
+            self.size -= 1
+
+    def snapshot(self):
+        """
+        Return the live events in the order they will be processed, without
+        removing them.
+        """
+        return [e[2] for e in sorted(self._entries()) if e[2] is not None]
+
+    def empty(self):
+        return self.size == 0
+
+    def __len__(self):
+        return self.size
+
+    def _entries(self):
+        raise NotImplementedError
+
+
+class HeapEventList(FutureEventList):
+    """
+    FEL backed by a binary heap (heapq). O(log n) put and get.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.heap = list()
+
+    def put(self, event):
+        entry = [event.time, next(self.counter), event]
+        heapq.heappush(self.heap, entry)
+        self.size += 1
+        return entry
+
+    def get(self):
+        heap = self.heap
+        while heap:
+            entry = heapq.heappop(heap)
+            event = entry[2]
+            if event is not None:
+                # Mark the entry dead so a late cancel() is harmless
+                entry[2] = None
+                self.size -= 1
+                return event
+        raise IndexError('get from an empty event list')
+
+    def peek(self):
+        heap = self.heap
+        # Dead entries at the front can go now
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def _entries(self):
+        return self.heap
+
+
+class CalendarEventList(FutureEventList):
+    """
+    FEL backed by a calendar queue (R. Brown, 1988).
+
+    Time is divided into slots of `width`, and slot k is stored in bucket
+    k % nbuckets, kept sorted. Dequeueing scans forward from the current slot,
+    so put and get are O(1) on average when the width matches the spacing of
+    events. The number of buckets doubles or halves with the number of events,
+    re-estimating the width from the events at the front of the list.
+    """
+
+    MIN_BUCKETS = 2
+
+    def __init__(self, nbuckets=MIN_BUCKETS, width=1.0):
+        super().__init__()
+        self.last_time = 0.0
+        self._build(nbuckets, width, list())
+
+    def put(self, event):
+        entry = [event.time, next(self.counter), event]
+        insort(self.buckets[int(event.time / self.width) & self.mask], entry)
+        self.size += 1
+        if self.size > 2 * self.nbuckets:
+            self._resize(2 * self.nbuckets)
+        return entry
+
+    def get(self):
+        while True:
+            entry = self._pop_min()
+            if entry is None:
+                raise IndexError('get from an empty event list')
+            event = entry[2]
+            if event is not None:
+                entry[2] = None
+                self.size -= 1
+                self.last_time = entry[0]
+                if (self.nbuckets > self.MIN_BUCKETS
+                        and self.size < self.nbuckets // 2 - 2):
+                    self._resize(self.nbuckets // 2)
+                return event
+
+    def peek(self):
+        # Finding the minimum moves the cursor forward; put it back, or an
+        # event scheduled before the peeked one would be skipped by get()
+        slot = self.slot
+        try:
+            while True:
+                entry = self._pop_min()
+                if entry is None:
+                    return None
+                if entry[2] is not None:
+                    # Put it back at the front of its bucket
+                    self.buckets[int(entry[0] / self.width)
+                                 & self.mask].insert(0, entry)
+                    return entry[2]
+        finally:
+            self.slot = slot
+
+    def _pop_min(self):
+        buckets = self.buckets
+        width = self.width
+        mask = self.mask
+        # Scan one year of buckets starting at the current slot, taking the
+        # first entry that falls in the slot being looked at
+        slot = self.slot
+        for _ in range(self.nbuckets):
+            bucket = buckets[slot & mask]
+            if bucket and int(bucket[0][0] / width) <= slot:
+                self.slot = slot
+                return bucket.pop(0)
+            slot += 1
+
+        # Nothing within a year: fall back to a direct search for the minimum
+        heads = [b[0] for b in buckets if b]
+        if not heads:
+            return None
+        entry = min(heads)
+        self.slot = int(entry[0] / width)
+        return buckets[self.slot & mask].pop(0)
+
+    def _resize(self, nbuckets):
+        live = sorted(e for e in self._entries() if e[2] is not None)
+        self._build(nbuckets, self._estimate_width(live), live)
+
+    def _build(self, nbuckets, width, entries):
+        self.nbuckets = nbuckets
+        self.mask = nbuckets - 1
+        self.width = width
+        self.buckets = [list() for _ in range(nbuckets)]
+        # entries are already sorted, so appending keeps each bucket sorted
+        for e in entries:
+            self.buckets[int(e[0] / width) & self.mask].append(e)
+        self.slot = int(self.last_time / width)
+
+    def _estimate_width(self, entries):
+        """
+        Brown's heuristic: three times the average separation of the events
+        at the front of the list, ignoring unusually large gaps.
+        """
+        sample = [e[0] for e in entries[:25]]
+        gaps = [b - a for a, b in zip(sample, sample[1:])]
+        if not gaps:
+            return self.width
+        mean = sum(gaps) / len(gaps)
+        small = [g for g in gaps if g <= 2 * mean]
+        if small:
+            mean = sum(small) / len(small)
+        if mean <= 0:
+            return self.width
+        return 3 * mean
+
+    def _entries(self):
+        return [e for b in self.buckets for e in b]
+
+
+FEL_TYPES = {
+    'heap': HeapEventList,
+    'calendar': CalendarEventList,
+}
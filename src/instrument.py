@@ -0,0 +1,174 @@
+import io
+import os
+import time
+
+PROFILE_KINDS = ('cprofile', 'tracemalloc')
+# Lines of profiler output included in a report
+PROFILE_LINES = 20
+
+
+class Instrumentation:
+    """
+    Call counts and cumulative wall time of the parts of a System's event
+    loop: each event handler, each inspector's routing decisions, the state
+    recorder and the CSV log and export calls.
+
+    Instrumentation is opt-in and installed on a System after it has been
+    built, by replacing the instrumented methods on that instance with timed
+    wrappers (handlers in the dispatch table). A System without it runs the
+    original methods, so there is no overhead when it is off.
+    """
+
+    def __init__(self):
+        self.counts = dict()
+        self.times = dict()
+        self.wall_time = 0.0
+
+    def wrap(self, label, fn):
+        """
+        Return a version of fn that adds its calls and wall time to label.
+        """
+        self.counts.setdefault(label, 0)
+        self.times.setdefault(label, 0.0)
+        counts = self.counts
+        times = self.times
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                times[label] += clock() - start
+                counts[label] += 1
+        return timed
+
+    def install(self, system):
+        """
+        Instrument a System that has not started running yet.
+        """
+        system.handlers = [self.wrap(h.__name__, h) if h is not None else h
+                           for h in system.handlers]
+        for ins in system.inspectors:
+            ins.router.choose = self.wrap(f'routing.{ins.id}',
+                                          ins.router.choose)
+        system.record_state = self.wrap('record_state', system.record_state)
+        system.export_state = self.wrap('export_state', system.export_state)
+        if system.log is not None:
+            system.log.write_row = self.wrap('log.write_row',
+                                             system.log.write_row)
+            system.log.flush = self.wrap('log.flush', system.log.flush)
+            system.log.close = self.wrap('log.close', system.log.close)
+
+    def run(self, system):
+        """
+        Run the system, timing the whole run as well.
+        """
+        start = time.perf_counter()
+        try:
+            system.run()
+        finally:
+            self.wall_time += time.perf_counter() - start
+
+    def report(self):
+        """
+        Return a table of calls, total and mean time per label, slowest
+        first. Routing and logging are called from within the handlers, so
+        their times are also part of the handlers' times.
+        """
+        lines = [f'Wall time: {self.wall_time:.6f} s',
+                 f"{'label':<24} {'calls':>10} {'total s':>12} "
+                 f"{'mean us':>10} {'share':>7}"]
+        for label in sorted(self.times, key=self.times.get, reverse=True):
+            calls = self.counts[label]
+            total = self.times[label]
+            mean = 1e6 * total / calls if calls else 0.0
+            share = total / self.wall_time if self.wall_time else 0.0
+            lines.append(f'{label:<24} {calls:>10} {total:>12.6f} '
+                         f'{mean:>10.2f} {share:>7.1%}')
+        return '\n'.join(lines)
+
+
+class Profiler:
+    """
+    Optional cProfile or tracemalloc capture around one replication.
+    """
+
+    def __init__(self, kind):
+        if kind not in PROFILE_KINDS:
+            raise ValueError(f'Unknown profiler {kind}')
+        self.kind = kind
+        self.profile = None
+        self.snapshot = None
+        self.peak = 0
+
+    def start(self):
+        if self.kind == 'cprofile':
+            import cProfile
+
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            import tracemalloc
+
+            tracemalloc.start()
+
+    def stop(self):
+        if self.kind == 'cprofile':
+            self.profile.disable()
+        else:
+            import tracemalloc
+
+            self.snapshot = tracemalloc.take_snapshot()
+            self.peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def save(self, path):
+        """
+        Write the raw cProfile statistics (for pstats or snakeviz) to path.
+        """
+        if self.profile is not None:
+            self.profile.dump_stats(path)
+
+    def report(self):
+        if self.kind == 'cprofile':
+            import pstats
+
+            out = io.StringIO()
+            stats = pstats.Stats(self.profile, stream=out)
+            stats.sort_stats('cumulative').print_stats(PROFILE_LINES)
+            return out.getvalue()
+        lines = [f'Peak traced memory: {self.peak / 1024:.1f} KiB']
+        for stat in self.snapshot.statistics('lineno')[:PROFILE_LINES]:
+            lines.append(str(stat))
+        return '\n'.join(lines)
+
+
+def run_instrumented(system, path, instrument=True, profile=None):
+    """
+    Run a System with instrumentation and/or a profiler, and write the
+    report to path (plus path with a .prof extension for cProfile data).
+    """
+    instrumentation = Instrumentation()
+    if instrument:
+        instrumentation.install(system)
+    profiler = Profiler(profile) if profile is not None else None
+
+    if profiler is not None:
+        profiler.start()
+    try:
+        instrumentation.run(system)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(f'Replication {system.replication_id}\n')
+        if instrument:
+            f.write(instrumentation.report() + '\n')
+        if profiler is not None:
+            f.write(f'\n{profiler.kind}:\n{profiler.report()}\n')
+    if profiler is not None:
+        profiler.save(os.path.splitext(path)[0] + '.prof')
+    return instrumentation
@@ -0,0 +1,102 @@
+class TimeWeightedStat:
+    """
+    Running time-weighted average of a piecewise-constant quantity, such as a
+    queue length or a busy flag.
+
+    update() is called only when the value changes and costs O(1); the area
+    under the curve is accumulated as the value is replaced.
+    """
+    __slots__ = ('value', 'last_time', 'start_time', 'area')
+
+    def __init__(self, value=0, time=0.0):
+        self.value = value
+        self.start_time = time
+        self.last_time = time
+        self.area = 0.0
+
+    def update(self, time, value):
+        """
+        Record that the quantity changed to value at the given time.
+        """
+        self.area += self.value * (time - self.last_time)
+        self.last_time = time
+        self.value = value
+
+    def total(self, time):
+        """
+        Integral of the quantity from the start up to the given time.
+        """
+        return self.area + self.value * (time - self.last_time)
+
+    def mean(self, time):
+        """
+        Time-weighted average from the start up to the given time.
+        """
+        elapsed = time - self.start_time
+        if elapsed <= 0:
+            return float(self.value)
+        return self.total(time) / elapsed
+
+    def reset(self, time):
+        """
+        Discard everything accumulated so far and start averaging again from
+        the given time, keeping the current value.
+        """
+        self.area = 0.0
+        self.start_time = time
+        self.last_time = time
+
+
+class KPICollector:
+    """
+    Online accumulators for the core KPIs of one replication: time-weighted
+    length of every buffer, busy fraction of every workstation, blocked
+    fraction of every inspector, and throughput of every product.
+
+    Accumulators are indexed like the CompiledModel's buffers, workstations
+    and inspectors. The System updates them only when the corresponding state
+    changes.
+    """
+
+    def __init__(self, model, time=0.0):
+        self.model = model
+        self.start_time = time
+        self.queue = [TimeWeightedStat(b.get_length(), time)
+                      for b in model.buffers]
+        self.busy = [TimeWeightedStat(int(w.busy), time)
+                     for w in model.workstations]
+        self.blocked = [TimeWeightedStat(0, time) for _ in model.inspectors]
+        # Products made and time each inspector spent blocked before
+        # start_time, subtracted from the totals and the throughput
+        self.products_offset = model.new_product_counts()
+        self.blocked_offset = [0.0] * len(model.inspectors)
+
+    def reset(self, time, products_made, time_blocked):
+        """
+        Restart every KPI from the given time, e.g. at the end of a warm-up
+        period, keeping the current state. time_blocked is each inspector's
+        blocked time so far.
+        """
+        self.start_time = time
+        for stat in self.queue + self.busy + self.blocked:
+            stat.reset(time)
+        self.products_offset = list(products_made)
+        self.blocked_offset = list(time_blocked)
+
+    def summary(self, time, products_made):
+        """
+        Return the KPIs from start_time up to the given time as a flat dict.
+        """
+        elapsed = time - self.start_time
+        results = dict()
+        for p, n, offset in zip(self.model.products, products_made,
+                                self.products_offset):
+            results[f'throughput_{p.name}'] = \
+                (n - offset) / elapsed if elapsed > 0 else 0.0
+        for w, stat in zip(self.model.workstations, self.busy):
+            results[f'utilization_{w.id}'] = stat.mean(time)
+        for name, stat in zip(self.model.buffer_names, self.queue):
+            results[f'mean_queue_{name}'] = stat.mean(time)
+        for i, stat in zip(self.model.inspectors, self.blocked):
+            results[f'blocked_fraction_{i.id}'] = stat.mean(time)
+        return results
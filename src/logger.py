@@ -1,10 +1,39 @@
+import queue
+import threading
+
+# Number of rows held in memory before they are written out as one chunk
+CHUNK_ROWS = 4096
+
+
 class Logger:
-    def __init__(self, out_path):
+    """
+    Streaming CSV writer for per-event statistics.
+
+    The output file is kept open for the whole run and rows are batched in
+    memory, then written CHUNK_ROWS at a time. With background=True the
+    batches are serialized and written by a worker thread so the event loop
+    never waits on disk. close() must be called to flush the last batch.
+    """
+
+    def __init__(self, out_path, chunk_rows=CHUNK_ROWS, background=False):
         self.path = out_path
         self.sep = ','
+        self.chunk_rows = chunk_rows
+        self.background = background
+        self.rows = list()
+        self.file = None
+        self.closed = False
 
+        if background:
+            # Bounded, so a slow disk applies back-pressure instead of
+            # letting unwritten rows pile up in memory
+            self.pending = queue.Queue(maxsize=4)
+            self.error = None
+            self.worker = threading.Thread(target=self._drain, daemon=True)
+            self.worker.start()
 
-    def write_header(self):
+
+    def write_header(self, columns=None):
         header_lines = (
             'time',
             'blocked_IN1',
@@ -13,12 +42,85 @@ class Logger:
             'total_P2',
             'total_P3'
         )
-        with open(self.path, 'w') as f:
-            f.write(self.sep.join(header_lines) + '\n')
+        if columns is not None:
+            header_lines = columns
+        self.file = open(self.path, 'w')
+        self.file.write(self.sep.join(header_lines) + '\n')
+
 
-    
     def write_data(self, data_dict):
-        with open(self.path, 'a') as f:
-            f.write(self.sep.join(
-                str(x) for x in data_dict.values()
-            ) + '\n')
+        self.write_row(tuple(data_dict.values()))
+
+
+    def write_row(self, values):
+        """
+        Append one row of values, in header order. The sequence is kept as is
+        until it is written, so it must not be modified afterwards.
+        """
+        self.rows.append(values)
+        if len(self.rows) >= self.chunk_rows:
+            self.flush()
+
+
+    def flush(self):
+        """
+        Hand the rows buffered so far to the writer.
+        """
+        if not self.rows:
+            return
+        rows = self.rows
+        self.rows = list()
+        if self.background:
+            self._check_worker()
+            self.pending.put(rows)
+        else:
+            self._write_rows(rows)
+
+
+    def close(self):
+        """
+        Write out any buffered rows and close the file. Safe to call more than
+        once.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.flush()
+        if self.background:
+            self.pending.put(None)
+            self.worker.join()
+        if self.file is not None:
+            self.file.close()
+        if self.background:
+            self._check_worker()
+
+
+    def _write_rows(self, rows):
+        if self.file is None:
+            self.file = open(self.path, 'a')
+        sep = self.sep
+        self.file.write(''.join(
+            sep.join(str(x) for x in row) + '\n' for row in rows
+        ))
+
+
+    def _drain(self):
+        """
+        Background thread body: write batches until the None sentinel arrives.
+        """
+        while True:
+            rows = self.pending.get()
+            if rows is None:
+                return
+            if self.error is not None:
+                # Keep draining so the producer never blocks on a dead writer
+                continue
+            try:
+                self._write_rows(rows)
+            except Exception as e:
+                self.error = e
+
+
+    def _check_worker(self):
+        if self.error is not None:
+            raise self.error
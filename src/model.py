@@ -0,0 +1,44 @@
+class CompiledModel:
+    """
+    Dense integer indexing of a system's topology.
+
+    Built once, after the inspectors and workstations have been created. Every
+    inspector, workstation and buffer is given an `index` attribute (its
+    position in the lists below) and every workstation a `product_index`, so
+    the event loop can reach any entity or counter by position instead of
+    searching by ID string. The ID dictionaries are only meant for code
+    outside the event loop.
+    """
+
+    def __init__(self, inspectors, workstations):
+        self.inspectors = list(inspectors)
+        self.workstations = list(workstations)
+        # All buffers of all workstations, in workstation order, and their
+        # names ('WS2_C1')
+        self.buffers = list()
+        self.buffer_names = list()
+        # Product types, in order of the first workstation producing each
+        self.products = list()
+
+        for n, w in enumerate(self.workstations):
+            w.index = n
+            if w.output_type not in self.products:
+                self.products.append(w.output_type)
+            w.product_index = self.products.index(w.output_type)
+            for b in w.buffers.values():
+                b.index = len(self.buffers)
+                self.buffers.append(b)
+                self.buffer_names.append(f'{w.id}_{b.component_type.name}')
+
+        for n, i in enumerate(self.inspectors):
+            i.index = n
+
+        self.inspector_index = {i.id: i.index for i in self.inspectors}
+        self.workstation_index = {w.id: w.index for w in self.workstations}
+        self.product_index = {p: n for n, p in enumerate(self.products)}
+
+    def new_product_counts(self):
+        """
+        Return a zeroed per-product counter array, indexed by product index.
+        """
+        return [0] * len(self.products)
@@ -0,0 +1,182 @@
+import math
+
+# Relative accuracy of QuantileSketch estimates
+SKETCH_ACCURACY = 0.01
+
+
+class RunningMoments:
+    """
+    Count, mean and sum of squared deviations of a stream of observations
+    (Welford's algorithm).
+
+    Observations may be numbers or NumPy arrays of one fixed shape, which are
+    then tracked element-wise. Two accumulators over disjoint parts of a
+    stream are combined with merge() (Chan et al.), in any order and
+    grouping, so partial results can be computed in parallel.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean = self.mean + delta / self.count
+        self.m2 = self.m2 + delta * (x - self.mean)
+
+    def merge(self, other):
+        """
+        Fold the observations of another accumulator into this one.
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / count)
+        self.m2 = self.m2 + other.m2 \
+            + delta * delta * (self.count * other.count / count)
+        self.count = count
+        return self
+
+    def variance(self):
+        """
+        Sample variance (0 with fewer than two observations).
+        """
+        if self.count < 2:
+            return self.m2 * 0.0
+        return self.m2 / (self.count - 1)
+
+    def std(self):
+        return self.variance() ** 0.5
+
+    def half_width(self, confidence=0.95):
+        """
+        Half-width of the Student t confidence interval for the mean.
+        """
+        if self.count < 2:
+            return self.m2 * 0.0 + math.inf
+        t = t_quantile(0.5 + confidence / 2, self.count - 1)
+        return t * (self.variance() / self.count) ** 0.5
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile summary of non-negative observations with relative
+    error bounded by `accuracy` (the DDSketch log-bucket scheme).
+
+    Each observation only increments the count of its logarithmic bucket, so
+    memory grows with the spread of the data rather than its size, and two
+    sketches with the same accuracy merge exactly by adding bucket counts.
+    """
+
+    def __init__(self, accuracy=SKETCH_ACCURACY):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = dict()
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, x):
+        if x < 0:
+            raise ValueError('QuantileSketch only holds non-negative values')
+        self.count += 1
+        if x == 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(x) / self.log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError('Cannot merge sketches of different accuracy')
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """
+        Estimate the q-quantile (0 <= q <= 1), or NaN if the sketch is empty.
+        """
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+def t_quantile(p, df):
+    """
+    Quantile function of Student's t distribution with df degrees of freedom,
+    found by bisection on its CDF.
+    """
+    if p == 0.5:
+        return 0.0
+    if p < 0.5:
+        return -t_quantile(1 - p, df)
+    low, high = 0.0, 1.0
+    while t_cdf(high, df) < p:
+        low, high = high, high * 2
+    for _ in range(100):
+        mid = (low + high) / 2
+        if t_cdf(mid, df) < p:
+            low = mid
+        else:
+            high = mid
+        if high - low < 1e-12 * high:
+            break
+    return (low + high) / 2
+
+
+def t_cdf(t, df):
+    tail = 0.5 * _betainc(df / 2, 0.5, df / (df + t * t))
+    return 1 - tail if t > 0 else tail
+
+
+def _betainc(a, b, x):
+    """
+    Regularized incomplete beta function I_x(a, b), evaluated with the
+    continued fraction from Numerical Recipes.
+    """
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log(1 - x))
+    if x > (a + 1) / (a + b + 2):
+        return 1 - front * _betacf(b, a, 1 - x) / b
+    return front * _betacf(a, b, x) / a
+
+
+def _betacf(a, b, x):
+    tiny = 1e-300
+    c = 1.0
+    d = 1 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        m2 = 2 * m
+        for num in (m * (b - m) * x / ((a + m2 - 1) * (a + m2)),
+                    -(a + m) * (a + b + m) * x / ((a + m2) * (a + m2 + 1))):
+            d = 1 + num * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + num / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1) < 1e-15:
+            break
+    return h
@@ -0,0 +1,104 @@
+from array import array
+
+# Rows per sheet in the legacy .xls format (one row is used by the header)
+XLS_MAX_ROWS = 65536
+
+EXPORT_FORMATS = ('xls', 'csv', 'npz')
+
+# array typecode -> numpy dtype, used for the npz export
+_NUMPY_TYPES = {'d': 'f8', 'q': 'i8', 'B': 'u1'}
+
+
+class StateRecorder:
+    """
+    Columnar, in-memory record of the system state after each event.
+
+    Every column is a typed array preallocated to `capacity` rows and doubled
+    when it fills up, so recording a row is an amortized O(1) store of plain
+    numbers. Exporting the table to a file is a separate step done after the
+    run.
+    """
+
+    def __init__(self, columns, capacity=1024):
+        """
+        columns is a sequence of (name, typecode) pairs, where typecode is one
+        of 'd' (float), 'q' (integer) or 'B' (small unsigned integer/flag).
+        """
+        self.names = [name for name, _ in columns]
+        self.typecodes = [typecode for _, typecode in columns]
+        self.capacity = capacity
+        self.columns = [array(t, bytes(array(t).itemsize * capacity))
+                        for t in self.typecodes]
+        self.rows = 0
+
+    def record(self, values):
+        """
+        Append one row; values must be in column order.
+        """
+        if self.rows == self.capacity:
+            self._grow()
+        row = self.rows
+        for col, value in zip(self.columns, values):
+            col[row] = value
+        self.rows = row + 1
+
+    def column(self, name):
+        """
+        Return the recorded values of the named column.
+        """
+        return self.columns[self.names.index(name)][:self.rows]
+
+    def export(self, fmt, path):
+        if fmt == 'xls':
+            self.to_xls(path)
+        elif fmt == 'csv':
+            self.to_csv(path)
+        elif fmt == 'npz':
+            self.to_npz(path)
+        else:
+            raise ValueError(f'Unknown export format: {fmt}')
+
+    def to_csv(self, path):
+        columns = [col[:self.rows] for col in self.columns]
+        with open(path, 'w') as f:
+            f.write(','.join(self.names) + '\n')
+            f.writelines(','.join(map(str, row)) + '\n'
+                         for row in zip(*columns))
+
+    def to_xls(self, path):
+        """
+        Write the table to an Excel workbook. Tables longer than one .xls
+        sheet allows are continued on further sheets.
+        """
+        import xlwt
+
+        workbook = xlwt.Workbook()
+        rows_per_sheet = XLS_MAX_ROWS - 1
+        start = 0
+        sheet_num = 1
+        while start < self.rows or sheet_num == 1:
+            worksheet = workbook.add_sheet(f'log{sheet_num}')
+            for j, name in enumerate(self.names):
+                worksheet.write(0, j, name)
+            end = min(start + rows_per_sheet, self.rows)
+            for j, col in enumerate(self.columns):
+                for i in range(start, end):
+                    worksheet.write(i - start + 1, j, col[i])
+            start = end
+            sheet_num += 1
+        workbook.save(path)
+
+    def to_npz(self, path):
+        import numpy as np
+
+        arrays = dict()
+        for name, typecode, col in zip(self.names, self.typecodes,
+                                       self.columns):
+            arrays[name] = np.frombuffer(
+                col, dtype=_NUMPY_TYPES[typecode])[:self.rows].copy()
+        np.savez_compressed(path, **arrays)
+
+    def _grow(self):
+        for col in self.columns:
+            col.frombytes(bytes(col.itemsize * self.capacity))
+        self.capacity *= 2
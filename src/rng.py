@@ -1,6 +1,5 @@
 import math
-import matplotlib.pyplot as plt
-import numpy as np
+import random
 
 
 def generate_exp(L, generator):
@@ -8,6 +7,90 @@ def generate_exp(L, generator):
     return cdf_exponential_inverse(L, R)
 
 
+class AntitheticRandom(random.Random):
+    """
+    Generator whose random() returns 1 - R for every R the plain generator
+    with the same seed would return. Every variate derived from random() is
+    then mirrored, e.g. generate_exp turns short times into long ones, so a
+    run on these streams is negatively correlated with the run on the plain
+    streams.
+
+    Integer draws consume the stream exactly as the plain generator does, so
+    the two stay in step, and choice() picks the mirror image of the plain
+    generator's choice: seq[n - 1 - i] where it picks seq[i].
+    """
+
+    def random(self):
+        return 1.0 - super().random()
+
+    def getrandbits(self, k):
+        # Defining getrandbits makes random.Random draw integers from it, as
+        # the plain generator does, rather than from the mirrored random()
+        return super().getrandbits(k)
+
+    def choice(self, seq):
+        n = len(seq)
+        return seq[n - 1 - self.randrange(n)]
+
+
+# Number of variates generated per refill of an ExpSampler
+BLOCK_SIZE = 4096
+
+
+class ExpSampler:
+    """
+    Block-vectorized replacement for generate_exp on a single random stream.
+
+    The sampler takes over the state of the given random.Random generator and
+    continues the same Mersenne Twister sequence in NumPy, producing
+    BLOCK_SIZE unit exponential variates at a time. sample(L) then only has to
+    scale the next pre-generated value. The uniforms are exactly those the
+    generator would have produced, so for a given seed the variates match
+    generate_exp(L, generator) to within floating point rounding of the log,
+    whatever the block size.
+
+    An AntitheticRandom generator gives a sampler of mirrored variates.
+    Once a generator has been handed to a sampler it should not be used
+    directly any more.
+    """
+
+    def __init__(self, generator, block_size=BLOCK_SIZE):
+        # NumPy is only loaded once a sampler is needed
+        import numpy as np
+
+        self.block_size = block_size
+        self.antithetic = isinstance(generator, AntitheticRandom)
+        self.state = np.random.RandomState()
+        _, internal, _ = generator.getstate()
+        # CPython's state is 624 words followed by the current position, the
+        # same layout as NumPy's legacy MT19937
+        self.state.set_state(
+            ('MT19937', np.array(internal[:-1], dtype=np.uint32), internal[-1]))
+        self.block = list()
+        self.pos = 0
+
+    def sample(self, L):
+        """
+        Return the next exponential variate with rate L.
+        """
+        if self.pos == len(self.block):
+            self._refill()
+        x = self.block[self.pos]
+        self.pos += 1
+        return x / L
+
+    def _refill(self):
+        import numpy as np
+
+        R = self.state.random_sample(self.block_size)
+        if not self.antithetic:
+            R = 1 - R
+        # Same transform as cdf_exponential_inverse with L = 1; kept as a list
+        # because indexing a list is much cheaper than indexing an ndarray
+        self.block = (-np.log(R)).tolist()
+        self.pos = 0
+
+
 def cdf_exponential(L, X):
     return 1 - math.e ** (-L * X)
 
@@ -21,6 +104,8 @@ def exponential_test():
     Generate a plot of several histograms illustrating some sample distributions
     generated by the method.
     """
+    import matplotlib.pyplot as plt
+
     test_lambdas = [0.01, 0.5, 1, 2]
     num_samples = 10000
     num_bins = round(num_samples**0.5)
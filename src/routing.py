@@ -0,0 +1,200 @@
+from enum import Enum, auto
+import heapq
+
+
+class OutputPolicy(Enum):
+    NAIVE = auto()
+    SHORTEST_QUEUE = auto()
+    ROUND_ROBIN = auto()
+
+
+class RoutingPolicy:
+    """
+    Decides which workstation an inspector sends each component to.
+
+    A policy is built once per inspector with the workstations it can output
+    to, and only considers, for each component type, the candidates that have
+    a buffer of that type. Policies that keep an index over buffer state
+    list those buffers in watched_buffers(); the System then calls
+    buffer_changed() whenever one of them is enqueued to or dequeued from.
+    New policies subclass this and implement choose(), and can be passed to
+    Inspector in place of an OutputPolicy.
+    """
+
+    def __init__(self, workstations):
+        # Candidate workstations for each component type, in output order
+        self.candidates = dict()
+        for w in workstations:
+            for comp in w.buffers:
+                self.candidates.setdefault(comp, list()).append(w)
+
+    def choose(self, component):
+        """
+        Return the workstation to push the component to, or None if the
+        inspector is blocked.
+        """
+        raise NotImplementedError
+
+    def chosen(self, component, workstation):
+        """
+        Called once the component has actually been pushed to the workstation
+        returned by choose(); choose() is also used just to check whether the
+        inspector is blocked.
+        """
+        pass
+
+    def watched_buffers(self):
+        return list()
+
+    def buffer_changed(self, buffer):
+        pass
+
+    def get_state(self):
+        """
+        Return whatever the policy needs, beyond the buffers' contents, to
+        carry on routing after a checkpoint is restored.
+        """
+        return None
+
+    def set_state(self, state):
+        """
+        Restore the value of get_state(), once the buffers have been restored.
+        """
+        pass
+
+
+class NaiveRouting(RoutingPolicy):
+    """
+    Push to the first candidate, in output order, with room in its buffer.
+    """
+
+    def choose(self, component):
+        for w in self.candidates.get(component, ()):
+            if not w.buffers[component].is_full():
+                return w
+        return None
+
+
+class ShortestQueueRouting(RoutingPolicy):
+    """
+    Push to the candidate with the shortest buffer that has room, ties going
+    to the lowest workstation ID. The inspector is only blocked when every
+    candidate buffer is full, which matters when capacities differ.
+
+    The candidates of each component type are kept in a heap ordered by
+    (full, length, priority), with entries
+    [full, length, priority, seq, workstation], so full buffers sort after
+    every buffer with room. A buffer change pushes a fresh entry and marks the
+    buffer's previous one stale by clearing its workstation, so updates and
+    choices cost O(log n) rather than a sort per choice.
+    """
+
+    def __init__(self, workstations):
+        super().__init__(workstations)
+        self.heaps = dict()
+        # Current heap entry of each watched buffer
+        self.entries = dict()
+        # Tie-break rank of each candidate, by ID
+        self.priority = dict()
+        # Entry counter, so entries never compare by workstation
+        self.counter = 0
+        for comp, candidates in self.candidates.items():
+            for rank, w in enumerate(sorted(candidates, key=lambda w: w.id)):
+                self.priority[w.buffers[comp]] = rank
+            self.heaps[comp] = list()
+            for w in candidates:
+                self._push(w.buffers[comp], w)
+
+    def choose(self, component):
+        heap = self.heaps.get(component)
+        if not heap:
+            return None
+        while heap[0][4] is None:
+            heapq.heappop(heap)
+        full, _, _, _, w = heap[0]
+        if full:
+            return None
+        return w
+
+    def watched_buffers(self):
+        return list(self.entries)
+
+    def buffer_changed(self, buffer):
+        entry = self.entries[buffer]
+        w = entry[4]
+        entry[4] = None
+        self._push(buffer, w)
+        heap = self.heaps[buffer.component_type]
+        # Drop stale entries once they outnumber the live ones
+        if len(heap) > 2 * len(self.candidates[buffer.component_type]) + 8:
+            heap[:] = [e for e in heap if e[4] is not None]
+            heapq.heapify(heap)
+
+    def set_state(self, state):
+        # Rebuild the index from the restored buffer lengths
+        for comp, candidates in self.candidates.items():
+            self.heaps[comp] = list()
+            for w in candidates:
+                self._push(w.buffers[comp], w)
+
+    def _push(self, buffer, w):
+        entry = [buffer.is_full(), buffer.get_length(), self.priority[buffer],
+                 self.counter, w]
+        self.counter += 1
+        self.entries[buffer] = entry
+        heapq.heappush(self.heaps[buffer.component_type], entry)
+
+
+class RoundRobinRouting(RoutingPolicy):
+    """
+    Push to the candidates of each component type in turn, skipping any whose
+    buffer is full; the turn moves on past the one chosen.
+    """
+
+    def __init__(self, workstations):
+        super().__init__(workstations)
+        # Position of the next candidate in turn, per component type
+        self.turn = {comp: 0 for comp in self.candidates}
+        self.position = {comp: {w: k for k, w in enumerate(candidates)}
+                         for comp, candidates in self.candidates.items()}
+
+    def choose(self, component):
+        candidates = self.candidates.get(component, ())
+        n = len(candidates)
+        start = self.turn.get(component, 0)
+        for k in range(n):
+            w = candidates[(start + k) % n]
+            if not w.buffers[component].is_full():
+                return w
+        return None
+
+    def chosen(self, component, workstation):
+        n = len(self.candidates[component])
+        self.turn[component] = (self.position[component][workstation] + 1) % n
+
+    def get_state(self):
+        return {comp.name: turn for comp, turn in self.turn.items()}
+
+    def set_state(self, state):
+        if state is None:
+            # Forked from a checkpoint taken under another policy
+            return
+        for comp in self.turn:
+            self.turn[comp] = state[comp.name]
+
+
+ROUTING_POLICIES = {
+    OutputPolicy.NAIVE: NaiveRouting,
+    OutputPolicy.SHORTEST_QUEUE: ShortestQueueRouting,
+    OutputPolicy.ROUND_ROBIN: RoundRobinRouting,
+}
+
+
+def make_router(policy, workstations):
+    """
+    Build the routing policy for an inspector. policy is an OutputPolicy, or
+    a RoutingPolicy subclass for a custom policy.
+    """
+    if isinstance(policy, OutputPolicy):
+        policy = ROUTING_POLICIES[policy]
+    return policy(workstations)
@@ -0,0 +1,248 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import fnmatch
+import math
+import os
+import random
+
+from config import default_spec
+from instrument import run_instrumented
+from moments import RunningMoments
+from system import LOG_DIR, System
+from tracing import make_trace_sink
+
+# KPIs the sequential stopping rule watches by default
+SEQUENTIAL_KPIS = ('throughput_*', 'blocked_fraction_*')
+
+# Model spec shared by every replication run in this worker process
+_worker_spec = None
+
+
+def _init_worker(spec):
+    """
+    Process pool initializer: receive the model spec once per worker instead
+    of once per replication.
+    """
+    global _worker_spec
+    _worker_spec = spec
+
+
+def run_replication(replication_id, master_seed, options, spec=None):
+    """
+    Run a single replication to completion and return its summary.
+    This is the unit of work sent to the worker processes, which use the
+    spec they were initialized with unless one is given.
+    """
+    if spec is None:
+        spec = _worker_spec
+    options = dict(options)
+    instrument = options.pop('instrument', False)
+    profile = options.pop('profile', None)
+    trace_kind = options.pop('trace')
+    trace_dir = os.path.join(options.get('log_dir', LOG_DIR), 'trace')
+    if trace_kind == 'file':
+        os.makedirs(trace_dir, exist_ok=True)
+    trace = make_trace_sink(
+        trace_kind,
+        path=os.path.join(trace_dir, f'rep{replication_id}.txt'),
+        every=options.pop('trace_every'),
+        window=options.pop('trace_window'))
+
+    try:
+        system = System(replication_id, trace, master_seed=master_seed,
+                        spec=spec, **options)
+        if instrument or profile is not None:
+            path = os.path.join(options.get('log_dir', LOG_DIR), 'profile',
+                                f'rep{replication_id}.txt')
+            run_instrumented(system, path, instrument, profile)
+        else:
+            system.run()
+    finally:
+        trace.close()
+    return system.summary()
+
+
+class ReplicationRunner:
+    """
+    Run independent replications of the System, optionally spread across a
+    pool of worker processes.
+
+    Every replication derives its random streams from the shared master seed
+    and its own replication id (see StreamManager), and writes to its own
+    rep{N} output files.
+    """
+
+    def __init__(self, spec=None, workers=1, master_seed=None, trace='none',
+                 trace_every=1, trace_window=None, log_background=False,
+                 exports=(), fel='heap', vectorized_rng=False,
+                 log_dir=LOG_DIR, event_log=True, warmup=0.0,
+                 antithetic=False, instrument=False, profile=None):
+        self.spec = spec if spec is not None else default_spec()
+        # 0 or None means one worker per core
+        self.workers = workers or os.cpu_count()
+        if master_seed is None:
+            master_seed = random.SystemRandom().getrandbits(64)
+        self.master_seed = master_seed
+        self.options = {
+            'trace': trace,
+            'trace_every': trace_every,
+            'trace_window': trace_window,
+            'log_background': log_background,
+            'exports': tuple(exports),
+            'fel': fel,
+            'vectorized_rng': vectorized_rng,
+            'log_dir': log_dir,
+            'event_log': event_log,
+            'warmup': warmup,
+            'antithetic': antithetic,
+            'instrument': instrument,
+            'profile': profile,
+        }
+
+    def run(self, replication_ids, pool=None):
+        """
+        Run the given replications, yielding each one's summary as soon as it
+        finishes. With more than one worker, results arrive in completion
+        order; pass a pool from self.pool() to reuse it across calls.
+        """
+        if self.workers == 1:
+            for r in replication_ids:
+                yield run_replication(r, self.master_seed, self.options,
+                                      self.spec)
+            return
+
+        if pool is None:
+            with self.pool() as pool:
+                yield from self.run(replication_ids, pool)
+            return
+        futures = [pool.submit(run_replication, r, self.master_seed,
+                               self.options)
+                   for r in replication_ids]
+        for future in as_completed(futures):
+            yield future.result()
+
+    def pool(self):
+        """
+        Return a process pool set up to run this runner's replications.
+        """
+        return ProcessPoolExecutor(max_workers=self.workers,
+                                   initializer=_init_worker,
+                                   initargs=(self.spec,))
+
+    def run_sequential(self, precision, kpis=SEQUENTIAL_KPIS, batch=10,
+                       confidence=0.95, max_replications=1000, absolute=0.0):
+        """
+        Run replications in batches until the confidence interval of every
+        KPI matching the kpis patterns has a half-width of at most
+        `precision` times its mean, or at most `absolute` (for KPIs whose
+        mean is close to 0), or max_replications have been run.
+
+        With antithetic replications, each pair is one sample: batches and
+        max_replications are rounded to whole pairs.
+
+        After each batch, yields the batch's summaries and a PrecisionReport
+        of all replications so far.
+        """
+        paired = self.options['antithetic']
+        if paired:
+            batch += batch % 2
+            max_replications -= max_replications % 2
+        report = PrecisionReport(kpis, precision, confidence, absolute,
+                                 paired)
+        pool = self.pool() if self.workers != 1 else None
+        try:
+            done = 0
+            while done < max_replications:
+                ids = range(done, min(done + batch, max_replications))
+                results = list(self.run(ids, pool))
+                for result in results:
+                    report.add(result)
+                done = ids.stop
+                yield results, report
+                if report.met():
+                    return
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+
+class PrecisionReport:
+    """
+    Running confidence intervals on the KPIs of a sequence of replications,
+    and the relative precision (half-width / |mean|) achieved on each.
+
+    With paired=True the replications are antithetic pairs (2k, 2k + 1),
+    which are not independent: each pair's average is one sample, added once
+    both halves have arrived, and count is the number of pairs.
+    """
+
+    def __init__(self, kpis, precision, confidence=0.95, absolute=0.0,
+                 paired=False):
+        self.patterns = kpis
+        self.precision = precision
+        self.absolute = absolute
+        self.confidence = confidence
+        self.paired = paired
+        self.moments = dict()
+        # KPIs of the first half of each incomplete pair, by pair
+        self.pending = dict()
+        # Independent samples so far, and replications they came from
+        self.count = 0
+        self.replications = 0
+
+    def add(self, summary):
+        if not self.moments:
+            for name in summary:
+                if any(fnmatch.fnmatchcase(name, p) for p in self.patterns):
+                    self.moments[name] = RunningMoments()
+        self.replications += 1
+        values = {name: summary[name] for name in self.moments}
+        if self.paired:
+            other = self.pending.pop(summary['replication'] // 2, None)
+            if other is None:
+                self.pending[summary['replication'] // 2] = values
+                return
+            values = {name: (x + other[name]) / 2
+                      for name, x in values.items()}
+        for name, moments in self.moments.items():
+            moments.add(values[name])
+        self.count += 1
+
+    def relative_precision(self, name):
+        """
+        Achieved relative precision of a KPI: 0 if it has not varied at all,
+        inf if there are too few replications or its mean is 0.
+        """
+        moments = self.moments[name]
+        half = moments.half_width(self.confidence)
+        if half == 0:
+            return 0.0
+        if moments.mean == 0:
+            return math.inf
+        return half / abs(moments.mean)
+
+    def met(self):
+        return all(self.kpi_met(name) for name in self.moments)
+
+    def kpi_met(self, name):
+        """
+        Whether a KPI's interval is within the relative precision, or within
+        the absolute one.
+        """
+        if self.relative_precision(name) <= self.precision:
+            return True
+        return (self.absolute > 0
+                and self.moments[name].half_width(self.confidence)
+                <= self.absolute)
+
+    def lines(self):
+        """
+        Describe every KPI's interval and achieved precision, one per line.
+        """
+        lines = list()
+        for name, moments in self.moments.items():
+            half = moments.half_width(self.confidence)
+            status = '' if self.kpi_met(name) else ', not met'
+            lines.append(f'{name}: {moments.mean:.6g} +/- {half:.3g} '
+                         f'(relative precision '
+                         f'{self.relative_precision(name):.3g}{status})')
+        return lines
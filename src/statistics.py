@@ -1,99 +1,257 @@
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import functools
 import numpy as np
 import os
 import pandas as pd
-import sys
+
+from moments import QuantileSketch, RunningMoments
 
 TIME_STEP = 10  # seconds
 SIM_DURATION = 1000
+# Rows read from a log at a time
+CHUNK_ROWS = 100000
 
 
 def load_file(path):
     return pd.read_csv(path)
 
 
-def average_value(df, val_name):
+def average_value(df, val_name, duration=SIM_DURATION):
     total = df.iloc[-1][val_name]
-    return total / SIM_DURATION
-
-
-def products_over_time(df):
-    prod_1 = value_over_time('total_P1', integer=True)
-    prod_2 = value_over_time('total_P2', integer=True)
-    prod_3 = value_over_time('total_P3', integer=True)
-    return (prod_1, prod_2, prod_3)
-
-
-def value_over_time(val_name, integer=False):
-    vals = list()
-    curr_time = 0.0
-    while curr_time < SIM_DURATION:
-        curr_rows = df.loc[(df['time'] > curr_time) & (
-            df['time'] <= curr_time + TIME_STEP)]
-        if not curr_rows.empty:
-            last_count = curr_rows.iloc[-1][val_name]
-            first_count = curr_rows.iloc[0][val_name]
-            difference = last_count - first_count
-            if integer:
-                difference = int(difference)
-            vals.append(difference)
-        else:
-            vals.append(0)
-        
-        curr_time = curr_time + TIME_STEP
-    return vals
-
-
-def plot_product(prod):
-    x = np.linspace(0, SIM_DURATION, int(SIM_DURATION/TIME_STEP))
+    return total / duration
+
+
+def products_over_time(df, bin_width=TIME_STEP, duration=SIM_DURATION):
+    series = binned_series(df, ['total_P1', 'total_P2', 'total_P3'],
+                           bin_width, duration)
+    return tuple(series[c].astype(int).tolist() for c in series.columns)
+
+
+def value_over_time(df, val_name, bin_width=TIME_STEP, duration=SIM_DURATION,
+                    integer=False):
+    vals = binned_series(df, [val_name], bin_width, duration)[val_name]
+    if integer:
+        vals = vals.astype(int)
+    return vals.tolist()
+
+
+def binned_series(df, columns=None, bin_width=TIME_STEP,
+                  duration=SIM_DURATION):
+    """
+    Split [0, duration) into bins of bin_width and return, for every column,
+    the change of its value between the first and the last row in each bin
+    (time in (start, start + bin_width]), or 0 for bins with no rows.
+
+    Every column is done in the same pass: the log is sorted by time, so the
+    first and last row of each bin are found with one binary search per bin
+    edge. By default all the total_* and blocked_* columns are binned.
+    """
+    binner = LogBinner(columns or _series_columns(df.columns), bin_width,
+                       duration)
+    binner.add(df)
+    return pd.DataFrame(binner.diffs(), columns=binner.columns,
+                        index=binner.edges[:-1])
+
+
+class LogBinner:
+    """
+    Incremental form of binned_series, fed the log one chunk of rows at a
+    time in order, so a file never has to be in memory all at once.
+    """
+
+    def __init__(self, columns, bin_width=TIME_STEP, duration=SIM_DURATION):
+        self.columns = list(columns)
+        nbins = int(np.ceil(duration / bin_width))
+        self.edges = np.arange(nbins + 1) * bin_width
+        # Values at the first and last row seen in each bin, NaN until then
+        self.first = np.full((nbins, len(self.columns)), np.nan)
+        self.last = np.full((nbins, len(self.columns)), np.nan)
+        # Values at the last row read
+        self.final = np.zeros(len(self.columns))
+
+    def add(self, chunk):
+        times = chunk['time'].to_numpy()
+        values = chunk[self.columns].to_numpy(dtype=float)
+        if not len(times):
+            return
+        edges = self.edges
+        first = np.searchsorted(times, edges[:-1], side='right')
+        end = np.searchsorted(times, edges[1:], side='right')
+        occupied = end > first
+        unset = occupied & np.isnan(self.first[:, 0])
+        self.first[unset] = values[first[unset]]
+        self.last[occupied] = values[end[occupied] - 1]
+        self.final = values[-1]
+
+    def diffs(self):
+        return np.nan_to_num(self.last - self.first)
+
+
+class LogSummary:
+    """
+    Partial cross-replication statistics of a set of logs: running moments of
+    every binned series, and moments plus a quantile sketch of every
+    end-of-run KPI.
+
+    Summaries of disjoint sets of logs are combined with merge(), which is
+    associative and commutative, so logs can be summarized in any order and
+    on any number of processes.
+    """
+
+    def __init__(self, columns, edges, duration):
+        self.columns = list(columns)
+        self.edges = edges
+        self.duration = duration
+        self.bins = RunningMoments()
+        self.kpis = {name: (RunningMoments(), QuantileSketch())
+                     for name in self.kpi_names()}
+
+    def kpi_names(self):
+        names = list(self.columns)
+        names += ['throughput_' + c[len('total_'):] for c in self.columns
+                  if c.startswith('total_')]
+        return names
+
+    def add(self, binner):
+        """
+        Add the binned series of one replication.
+        """
+        self.bins.add(binner.diffs())
+        final = dict(zip(self.columns, binner.final))
+        for c in self.columns:
+            if c.startswith('total_'):
+                final['throughput_' + c[len('total_'):]] = \
+                    final[c] / self.duration
+        for name, (moments, sketch) in self.kpis.items():
+            moments.add(final[name])
+            sketch.add(final[name])
+
+    def merge(self, other):
+        if other.columns != self.columns or \
+                not np.array_equal(other.edges, self.edges):
+            raise ValueError('Cannot merge summaries of different logs')
+        self.bins.merge(other.bins)
+        for name, (moments, sketch) in self.kpis.items():
+            moments.merge(other.kpis[name][0])
+            sketch.merge(other.kpis[name][1])
+        return self
+
+    def to_frame(self, confidence=0.95):
+        """
+        Return one tidy table with a row per (series, bin) and per KPI: the
+        number of replications, mean, standard deviation and confidence
+        interval, plus the 5th, 50th and 95th percentiles of the KPIs.
+        """
+        nbins = len(self.edges) - 1
+        ncols = len(self.columns)
+        mean = np.broadcast_to(self.bins.mean, (nbins, ncols))
+        std = np.broadcast_to(self.bins.std(), (nbins, ncols))
+        half = np.broadcast_to(self.bins.half_width(confidence),
+                               (nbins, ncols))
+        bins = pd.DataFrame({
+            'kind': 'bin',
+            'name': np.tile(self.columns, nbins),
+            'bin_start': np.repeat(self.edges[:-1], ncols),
+            'n': self.bins.count,
+            'mean': mean.ravel(),
+            'std': std.ravel(),
+            'ci_low': (mean - half).ravel(),
+            'ci_high': (mean + half).ravel(),
+        })
+
+        rows = list()
+        for name, (moments, sketch) in self.kpis.items():
+            half = moments.half_width(confidence)
+            rows.append({
+                'kind': 'kpi',
+                'name': name,
+                'n': moments.count,
+                'mean': moments.mean,
+                'std': moments.std(),
+                'ci_low': moments.mean - half,
+                'ci_high': moments.mean + half,
+                'p05': sketch.quantile(0.05),
+                'p50': sketch.quantile(0.5),
+                'p95': sketch.quantile(0.95),
+            })
+        return pd.concat([bins, pd.DataFrame(rows)], ignore_index=True)
+
+
+def summarize_log(path, bin_width=TIME_STEP, duration=SIM_DURATION,
+                  chunk_rows=CHUNK_ROWS):
+    """
+    Read one replication's log in chunks and return its LogSummary.
+    """
+    binner = None
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        if binner is None:
+            binner = LogBinner(_series_columns(chunk.columns), bin_width,
+                               duration)
+        binner.add(chunk)
+    if binner is None:
+        raise ValueError(f'{path} is empty')
+    summary = LogSummary(binner.columns, binner.edges, duration)
+    summary.add(binner)
+    return summary
+
+
+def summarize_logs(paths, bin_width=TIME_STEP, duration=SIM_DURATION,
+                   workers=1, chunk_rows=CHUNK_ROWS):
+    """
+    Summarize every log in paths, on a pool of worker processes if workers
+    is not 1 (0 uses every core), and return the merged LogSummary.
+    """
+    summarize = functools.partial(summarize_log, bin_width=bin_width,
+                                  duration=duration, chunk_rows=chunk_rows)
+    if workers == 1:
+        return functools.reduce(LogSummary.merge, map(summarize, paths))
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Several files per task, so small logs do not pay one round trip each
+        chunksize = max(1, len(paths) // (workers * 4))
+        return functools.reduce(
+            LogSummary.merge, pool.map(summarize, paths, chunksize=chunksize))
+
+
+def _series_columns(columns):
+    return [c for c in columns
+            if c.startswith('total_') or c.startswith('blocked_')]
+
+
+def plot_product(prod, bin_width=TIME_STEP, duration=SIM_DURATION):
+    import matplotlib.pyplot as plt
+
+    x = np.linspace(0, duration, int(np.ceil(duration / bin_width)))
     y = prod
     plt.plot(x, y)
     plt.show()
 
 
 if __name__ == '__main__':
-    log_dir = sys.argv[1]
-    csv_dir = os.path.join(log_dir, 'csv')
-
-    p1_means = list()
-    p2_means = list()
-    p3_means = list()
-
-    IN1_times = list()
-    IN2_times = list()
-
-    log_files = os.listdir(csv_dir)
-    for filename in log_files:
-        print(f'Processing {filename}...')
-        df = load_file(os.path.join(csv_dir, filename))
-
-        p1, p2, p3 = products_over_time(df)
-        IN1 = df.iloc[-1]['blocked_IN1']
-        IN2 = df.iloc[-1]['blocked_IN2']
-
-        p1_means.append(p1)
-        p2_means.append(p2)
-        p3_means.append(p3)
-        IN1_times.append(IN1)
-        IN2_times.append(IN2)
-
-    products = (p1_means, p2_means, p3_means)
-    names = ('P1', 'P2', 'P3')
-    for product, name in zip(products, names):
-        path = os.path.join(log_dir, name + '.csv')
-        with open(path, 'w') as f:
-            for row in product:
-                for num in row:
-                    f.write(str(num) + ',')
-                f.write('\n')
-
-    inspectors = (IN1_times, IN2_times)
-    names = ('IN1', 'IN2')
-    for list, name in zip(inspectors, names):
-        path = os.path.join(log_dir, name + '.csv')
-        with open(path, 'w') as f:
-            for time in list:
-                f.write(str(time) + ',')
-    
-    print('Done.')
-        
+    parser = argparse.ArgumentParser(
+        description='Summarize the per-event logs of a set of replications.')
+    parser.add_argument('log_dir', help='log directory of the runs')
+    parser.add_argument('--bin-width', type=float, default=TIME_STEP,
+                        help=f'width of the time bins (default: {TIME_STEP})')
+    parser.add_argument('--duration', type=float, default=SIM_DURATION,
+                        help=f'simulated time covered by the bins '
+                        f'(default: {SIM_DURATION})')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='worker processes (default: 0, every core)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='confidence level of the intervals '
+                        '(default: 0.95)')
+    parser.add_argument('--out', default=None,
+                        help='summary table to write '
+                        '(default: LOG_DIR/summary.csv)')
+    args = parser.parse_args()
+    csv_dir = os.path.join(args.log_dir, 'csv')
+
+    paths = sorted(os.path.join(csv_dir, f) for f in os.listdir(csv_dir))
+    print(f'Summarizing {len(paths)} logs...')
+    summary = summarize_logs(paths, args.bin_width, args.duration,
+                             args.workers)
+    out = args.out or os.path.join(args.log_dir, 'summary.csv')
+    summary.to_frame(args.confidence).to_csv(out, index=False)
+    print(f'Summary written to {out}')
@@ -0,0 +1,45 @@
+import hashlib
+import random
+
+from rng import AntitheticRandom
+
+
+class StreamManager:
+    """
+    Hands out the random number streams used by one replication.
+
+    Every stream is identified by a name (e.g. 'IN1.inspection') and gets its
+    own Mersenne Twister generator, seeded with a SHA-256 hash of the master
+    seed, the replication id and the name. A stream therefore depends only on
+    those three values: the same replication can be rerun on its own, out of
+    order or on another worker, and adding a new stream never shifts the
+    existing ones. Hashing gives each stream an unrelated 256-bit seed, so
+    the chance of two streams overlapping within a run is negligible.
+
+    Because of this, two configurations run with the same master seed and
+    replication id use common random numbers: each inspector and workstation
+    draws the same sequence in both. With antithetic=True every stream is an
+    AntitheticRandom, mirroring the plain streams with the same seeds.
+    """
+
+    def __init__(self, master_seed=None, replication_id=0, antithetic=False):
+        if master_seed is None:
+            master_seed = random.SystemRandom().getrandbits(64)
+        self.master_seed = master_seed
+        self.replication_id = replication_id
+        self.antithetic = antithetic
+
+    def seed(self, name):
+        """
+        Return the integer seed of the named stream.
+        """
+        key = f'{self.master_seed}/{self.replication_id}/{name}'
+        return int.from_bytes(hashlib.sha256(key.encode()).digest(), 'big')
+
+    def stream(self, name):
+        """
+        Return a new generator for the named stream, positioned at its start.
+        """
+        if self.antithetic:
+            return AntitheticRandom(self.seed(name))
+        return random.Random(self.seed(name))
@@ -0,0 +1,204 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+
+from config import default_spec, load_spec
+from runner import run_replication
+from system import LOG_DIR
+
+# Model specs of every design point, set in each worker by _init_worker
+_point_specs = None
+
+
+def grid_design(factors):
+    """
+    Full factorial design. factors maps parameter paths (see
+    ModelSpec.with_overrides) to lists of levels; returns one dict of
+    overrides per combination.
+    """
+    names = list(factors)
+    return [dict(zip(names, levels))
+            for levels in itertools.product(*(factors[n] for n in names))]
+
+
+def latin_hypercube(factors, points, seed=None):
+    """
+    Latin hypercube design with the given number of points. factors maps
+    parameter paths to either a [low, high] range, sampled uniformly within
+    each stratum, or a {"levels": [...]} list of discrete levels, which are
+    spread evenly over the strata. A range whose ends are both integers, such
+    as a buffer_capacity, is sampled as integers from low to high inclusive.
+    """
+    rng = random.Random(seed)
+    design = [dict() for _ in range(points)]
+    for name, factor in factors.items():
+        strata = list(range(points))
+        rng.shuffle(strata)
+        for point, stratum in zip(design, strata):
+            if isinstance(factor, dict):
+                levels = factor['levels']
+                point[name] = levels[stratum * len(levels) // points]
+            else:
+                low, high = factor
+                u = (stratum + rng.random()) / points
+                if _is_int(low) and _is_int(high):
+                    # Every integer gets an equal share of the strata
+                    point[name] = min(low + int(u * (high - low + 1)), high)
+                else:
+                    point[name] = low + u * (high - low)
+    return design
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _init_worker(specs):
+    global _point_specs
+    _point_specs = specs
+
+
+def run_point(point, replication_id, master_seed, options, specs=None):
+    """
+    Run one replication of one design point and return its summary.
+    """
+    if specs is None:
+        specs = _point_specs
+    options = dict(options)
+    options['log_dir'] = os.path.join(options['log_dir'], f'point{point}')
+    summary = run_replication(replication_id, master_seed, options,
+                              specs[point])
+    summary['point'] = point
+    return summary
+
+
+class Sweep:
+    """
+    Run every point of an experimental design for a number of replications,
+    spread over a process pool.
+
+    Jobs are submitted longest first (by ModelSpec.cost), so the expensive
+    ones do not end up running alone at the end of the sweep. All points use
+    the same master seed, so replication r of every point draws from the
+    same random streams.
+    """
+
+    def __init__(self, base_spec, design, replications, workers=0,
+                 master_seed=None, log_dir=os.path.join(LOG_DIR, 'sweep'),
+                 warmup=0.0):
+        self.design = design
+        self.specs = [base_spec.with_overrides(p) for p in design]
+        self.replications = replications
+        self.workers = workers or os.cpu_count()
+        if master_seed is None:
+            master_seed = random.SystemRandom().getrandbits(64)
+        self.master_seed = master_seed
+        self.options = {
+            'trace': 'none',
+            'trace_every': 1,
+            'trace_window': None,
+            'exports': (),
+            'log_dir': log_dir,
+            # The summaries carry the KPIs, so skip the per-event logs
+            'event_log': False,
+            'warmup': warmup,
+        }
+
+    def jobs(self):
+        """
+        Return the (point, replication) pairs to run, longest first.
+        """
+        jobs = [(p, r) for p in range(len(self.specs))
+                for r in range(self.replications)]
+        jobs.sort(key=lambda job: self.specs[job[0]].cost(), reverse=True)
+        return jobs
+
+    def run(self):
+        """
+        Run every job, yielding summaries as they finish.
+        """
+        if self.workers == 1:
+            for p, r in self.jobs():
+                yield run_point(p, r, self.master_seed, self.options,
+                                self.specs)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.specs,)) as pool:
+            futures = [pool.submit(run_point, p, r, self.master_seed,
+                                   self.options)
+                       for p, r in self.jobs()]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def write_results(self, path, results):
+        """
+        Write one consolidated table: the design point's parameters followed
+        by the replication's results, one row per replication. Without any
+        results (an empty design or no replications) only the point, factor
+        and replication columns are written.
+        """
+        results = sorted(results,
+                         key=lambda s: (s['point'], s['replication']))
+        factors = list(self.design[0]) if self.design else list()
+        outputs = [k for k in results[0]
+                   if k not in ('point', 'replication')] if results else []
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['point'] + factors + ['replication'] + outputs)
+            for s in results:
+                levels = [self.design[s['point']][n] for n in factors]
+                writer.writerow([s['point']] + levels + [s['replication']]
+                                + [s[k] for k in outputs])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Run a parameter sweep over the simulation model.')
+    parser.add_argument('design', help='JSON design file with either a "grid" '
+                        'of levels or an "lhs" of ranges plus "points"')
+    parser.add_argument('--model', default=None, metavar='PATH',
+                        help='base model spec (default: the built-in model)')
+    parser.add_argument('--replications', type=int, default=10,
+                        help='replications per design point (default: 10)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='worker processes (default: 0, every core)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='master seed (default: random)')
+    parser.add_argument('--warmup', type=float, default=0.0, metavar='TIME',
+                        help='discard KPIs collected before this clock time '
+                        '(default: 0)')
+    parser.add_argument('--out', default=os.path.join(LOG_DIR, 'sweep.csv'),
+                        help='results table to write (default: log/sweep.csv)')
+    args = parser.parse_args()
+
+    with open(args.design) as f:
+        design_spec = json.load(f)
+    if 'grid' in design_spec:
+        design = grid_design(design_spec['grid'])
+    else:
+        design = latin_hypercube(design_spec['lhs'], design_spec['points'],
+                                 args.seed)
+
+    base = load_spec(args.model) if args.model else default_spec()
+    sweep = Sweep(base, design, args.replications, args.workers, args.seed,
+                  warmup=args.warmup)
+    total = len(design) * args.replications
+    results = list()
+    try:
+        for n, result in enumerate(sweep.run(), 1):
+            results.append(result)
+            print(f"\r{n}/{total} replications done", end='', flush=True)
+    finally:
+        # End the progress line, even if the sweep failed part way
+        if results:
+            print()
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    sweep.write_results(args.out, results)
+    print(f'Results written to {args.out}')
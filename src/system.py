@@ -1,156 +1,250 @@
 # _*_ coding: utf-8 _*_
-import time
-
-import xlwt
-
-
+import argparse
 import os
-import random
-from queue import PriorityQueue
 import sys
 
-from component import ComponentType, ProductType
-from event import *
-from inspector import Inspector, OutputPolicy
+from config import default_spec, load_spec
+from event import ASSEMBLY, END, INSPECTION, WARMUP, EventPool
+from fel import FEL_TYPES
+from inspector import Inspector
+from instrument import PROFILE_KINDS
+from kpi import KPICollector
 from logger import Logger
-from rng import generate_exp
+from model import CompiledModel
+from recorder import EXPORT_FORMATS, StateRecorder
+from rng import ExpSampler
+from streams import StreamManager
+from tracing import TRACE_KINDS, TraceSink
 from workstation import Workstation
 
+# Default master seed for the random streams; None picks a fresh one per run
 rng_seed = None
 
-END_TIME = 1000.00
-# Lambda values for the various distributions
-# Inspectors
-IN1_LAM = 0.0965
-IN2_LAM_C2 = 0.0644
-IN2_LAM_C3 = 0.0485
-# Workstations
-WS1_LAM = 0.2172
-WS2_LAM = 0.09015
-WS3_LAM = 0.1137
-
 LOG_DIR = 'log'
 
 
 class System():
-    def __init__(self, replication_id):  # BS: class constructor
-        print('Simulation Start')
+    def __init__(self, replication_id, trace=None, log_background=False,
+                 exports=(), fel='heap', master_seed=rng_seed,
+                 vectorized_rng=False, spec=None,
+                 log_dir=LOG_DIR, event_log=False,
+                 warmup=0.0, antithetic=False):  # BS: class constructor
+        # Nothing is written to disk unless an event log or exports are
+        # requested, so a System can be embedded and driven with step(),
+        # run_until() and snapshots()
+        # Where the per-event state trace goes; discarded unless a sink is given
+        self.trace = trace if trace is not None else TraceSink()
+        self.trace.write('Simulation Start')
         self.running = True
+        self.replication_id = replication_id
+        # Plant topology, rates and run length (see config.py)
+        self.spec = spec if spec is not None else default_spec()
+        # Independent random streams for every entity in this replication.
+        # With antithetic=True, replications 2k and 2k + 1 form a pair: the
+        # odd one replays the even one's streams mirrored (see StreamManager)
+        self.antithetic = antithetic
+        if antithetic:
+            self.streams = StreamManager(master_seed, replication_id // 2,
+                                         antithetic=replication_id % 2 == 1)
+        else:
+            self.streams = StreamManager(master_seed, replication_id)
         # Track current time
         self.clock = 0
+        # Events processed so far
+        self.event_count = 0
 
         # Instantiate logger
-        EXCEL_DIR = os.path.join(LOG_DIR, 'excel')
-        CSV_DIR = os.path.join(LOG_DIR, 'csv')
-        os.makedirs(LOG_DIR, exist_ok=True)
-        os.makedirs(EXCEL_DIR, exist_ok=True)
-        os.makedirs(CSV_DIR, exist_ok=True)
-
-        OUT_PATH = os.path.join(CSV_DIR, f'rep{replication_id}.log')
-        self.log = Logger(OUT_PATH)
-        self.log.write_header()
-        # Track number of products output in order to calculate throughput
-        self.num_P1 = 0
-        self.num_P2 = 0
-        self.num_P3 = 0
-        # Track time inspectors (either, or both) spend blocked
-        self.blocked_time = 0
-        # blocked inspectors list
+        EXCEL_DIR = os.path.join(log_dir, 'excel')
+        CSV_DIR = os.path.join(log_dir, 'csv')
+        STATE_DIR = os.path.join(log_dir, 'state')
+        if event_log:
+            os.makedirs(CSV_DIR, exist_ok=True)
+        if 'xls' in exports:
+            os.makedirs(EXCEL_DIR, exist_ok=True)
+        if 'csv' in exports or 'npz' in exports:
+            os.makedirs(STATE_DIR, exist_ok=True)
+
+        # blocked inspectors list, in the order they became blocked
         self.blocked_inspectors = list()
+        # Blocked inspectors woken by a buffer getting a free slot, waiting
+        # for wake_inspectors() to retry them
+        self.wakeups = list()
+        self.waking = False
         # Setup FEL
-        self.event_list = PriorityQueue()
+        self.event_list = FEL_TYPES[fel]()
+        # Recycled event objects
+        self.event_pool = EventPool()
+        # Event handlers, indexed by event kind
+        self.handlers = [None] * 4
+        self.handlers[INSPECTION] = self.event_inspection
+        self.handlers[ASSEMBLY] = self.event_assembly
+        self.handlers[END] = self.event_end
+        self.handlers[WARMUP] = self.event_warmup
 
         # Create workstations
-        ws_1 = Workstation(self, 'WS1', WS1_LAM, [ComponentType.C1], ProductType.P1)
-        ws_2 = Workstation(self, 'WS2', WS2_LAM, [ComponentType.C1, ComponentType.C2], ProductType.P2)
-        ws_3 = Workstation(self, 'WS3', WS3_LAM, [ComponentType.C1, ComponentType.C3], ProductType.P3)
+        stations = dict()
+        for ws in self.spec.workstations:
+            stations[ws.id] = Workstation(
+                self, ws.id, ws.lam, ws.inputs, ws.output,
+                self.streams.stream(f'{ws.id}.assembly'),
+                capacities=ws.capacities)
         # LBS: without need to declare workstations as list
-        self.workstations = [ws_1, ws_2, ws_3]
+        self.workstations = list(stations.values())
 
         # Create inspectors
-        # LBS: ins_1_lambdas is a dict formatted as �� key: value...��
-        ins_1_lambdas = {ComponentType.C1: IN1_LAM}
-        ins_1 = Inspector(self, 'IN1', ins_1_lambdas, [ComponentType.C1], 
-                            [ws_1, ws_2, ws_3], OutputPolicy.NAIVE)
-
-        ins_2_lambdas = {ComponentType.C2: IN2_LAM_C2, ComponentType.C3: IN2_LAM_C3}
-        ins_2 = Inspector(self, 'IN2', ins_2_lambdas, 
-                            [ComponentType.C2, ComponentType.C3], [ws_2, ws_3],
-                            OutputPolicy.NAIVE)
-        self.inspectors = [ins_1, ins_2]
+        self.inspectors = list()
+        for ins in self.spec.inspectors:
+            self.inspectors.append(Inspector(
+                self, ins.id, ins.lambdas, ins.inputs,
+                [stations[ws_id] for ws_id in ins.outputs], ins.routing,
+                self.streams.stream(f'{ins.id}.inspection'),
+                self.streams.stream(f'{ins.id}.choice')))
+
+        # Give every entity a dense integer index; events and counters refer
+        # to entities by index from here on
+        self.model = CompiledModel(self.inspectors, self.workstations)
+        # Track number of products output in order to calculate throughput,
+        # indexed by product index
+        self.products_made = self.model.new_product_counts()
+
+        # Online KPI accumulators, updated whenever the state they track
+        # changes
+        self.kpi = KPICollector(self.model)
+        self.kpis = None
+        for b in self.model.buffers:
+            b.monitor = self.buffer_changed
+        # Blocked inspectors subscribed to each buffer, by buffer index
+        self.waiting = [list() for _ in self.model.buffers]
+        # Routing policies indexing each buffer's length, by buffer index
+        self.routers = [list() for _ in self.model.buffers]
+        for ins in self.inspectors:
+            for b in ins.router.watched_buffers():
+                self.routers[b.index].append(ins.router)
+
+        # Per-event CSV log; the KPIs do not need it, so it can be turned off
+        self.log = None
+        if event_log:
+            OUT_PATH = os.path.join(CSV_DIR, f'rep{replication_id}.log')
+            self.log = Logger(OUT_PATH, background=log_background)
+            self.log.write_header(self.log_columns())
+
+        if vectorized_rng:
+            # Draw service times in NumPy blocks from the same streams
+            for entity in self.workstations + self.inspectors:
+                entity.sampler = ExpSampler(entity.rng)
 
         # Generate initial events
-        # These should be the two inspectors' first component selections
-        self.schedule_inspection(ins_1, ins_1.generate_time(0, ins_1.component))
-        self.schedule_inspection(ins_2, ins_2.generate_time(0, ins_2.component))
+        # These should be the inspectors' first component selections
+        for ins in self.inspectors:
+            self.schedule_inspection(ins, ins.generate_time(0, ins.component))
 
         # As well as an end-simulation event
-        self.schedule_event(EndSimulationEvent(END_TIME))
-
-        # Open Excel log
-
-        self.TimeColumn = 0
-        self.CurrentEventColumn = 1
-        self.EventListColumn = 2
-        self.Inspector1Column = 3
-        self.Inspector2Column = 4
-        self.WS1_C1_Q_Column = 5
-        self.WS2_C1_Q_Column = 6
-        self.WS2_C2_Q_Column = 7
-        self.WS3_C1_Q_Column = 8
-        self.WS3_C3_Q_Column = 9
-        self.BLOCKED_IN1 = 10
-        self.BLOCKED_IN2 = 11
-        self.NUM_P1 = 12
-        self.NUM_P2 = 13
-        self.NUM_P3 = 14
-        self.BLOCK_INS_LIST = 15
-        self.WS1_BUSY = 16
-        self.WS2_BUSY = 17
-        self.WS3_BUSY = 18
-
-        self.now = time.strftime("%H-%M-%S")
-        self.logfile = os.path.join(EXCEL_DIR, "Log" + str(replication_id) + ".xls")
-        print("new file:" + self.logfile)
-        self.workbook = xlwt.Workbook(self.logfile)
-        self.worksheet = self.workbook.add_sheet(
-            'log1', cell_overwrite_ok=True)
-        self.rows_old = 0
-        self.write_excel_xls_append("Time", self.TimeColumn)
-        self.write_excel_xls_append("CurrentEvent", self.CurrentEventColumn)
-        self.write_excel_xls_append("EventList", self.EventListColumn)
-        self.write_excel_xls_append("Inspector1", self.Inspector1Column)
-        self.write_excel_xls_append("Inspector2", self.Inspector2Column)
-        self.write_excel_xls_append("WS1_C1_Q", self.WS1_C1_Q_Column)
-        self.write_excel_xls_append("WS2_C1_Q", self.WS2_C1_Q_Column)
-        self.write_excel_xls_append("WS2_C2_Q", self.WS2_C2_Q_Column)
-        self.write_excel_xls_append("WS3_C1_Q", self.WS3_C1_Q_Column)
-        self.write_excel_xls_append("WS3_C3_Q", self.WS3_C3_Q_Column)
-
-        self.write_excel_xls_append("blocked_IN1", self.BLOCKED_IN1)
-        self.write_excel_xls_append("blocked_IN2", self.BLOCKED_IN2)
-        self.write_excel_xls_append("num_P1", self.NUM_P1)
-        self.write_excel_xls_append("num_P2", self.NUM_P2)
-        self.write_excel_xls_append("num_P3", self.NUM_P3)
-        self.write_excel_xls_append("blockInsList", self.BLOCK_INS_LIST)
-        self.write_excel_xls_append("ws1Busy", self.WS1_BUSY)
-        self.write_excel_xls_append("ws2Busy", self.WS2_BUSY)
-        self.write_excel_xls_append("ws3Busy", self.WS3_BUSY)
-
-
-        # Print initial state to console
-        self.print_current_state_beforeproc(None)
-        self.print_inspectors()
-        self.print_workstations()
-        self.print_event_list()
-        self.print_current_state_afterproc(None)
+        self.schedule_event(self.event_pool.acquire(self.spec.end_time, END))
+        # And, if there is a warm-up period, the event that ends it
+        self.warmup = warmup
+        if 0 < warmup < self.spec.end_time:
+            self.schedule_event(self.event_pool.acquire(warmup, WARMUP))
+
+        # Per-event state snapshots, exported once the run is over; only
+        # kept when there is somewhere to export them to
+        self.recorder = None
+        if exports:
+            self.recorder = StateRecorder(self.state_columns())
+        self.exports = exports
+        self.export_paths = dict()
+        for fmt in exports:
+            if fmt == 'xls':
+                path = os.path.join(EXCEL_DIR, f'Log{replication_id}.xls')
+            else:
+                path = os.path.join(STATE_DIR, f'rep{replication_id}.{fmt}')
+            self.export_paths[fmt] = path
+
+        # Record initial state
+        if self.trace.accepts(self.clock):
+            self.print_state(None)
+        if self.recorder is not None:
+            self.record_state()
+
+    def run(self):
+        """
+        Advance the simulation until the end-of-simulation event. Buffered log
+        rows are flushed to disk even if the run fails part way through.
+        """
+        try:
+            while self.running:
+                self.time_advance()
+        finally:
+            self.close()
 
-        # Print initial state to console
-        self.print_current_state_beforeproc(None)
-        self.print_inspectors()
-        self.print_workstations()
-        self.print_event_list()
-        self.print_current_state_afterproc(None)
+    def step(self, n=1):
+        """
+        Process the next n events, or fewer if the run ends first, and return
+        the number processed.
+        """
+        done = 0
+        while done < n and self.running:
+            self.time_advance()
+            done += 1
+        if not self.running:
+            self.close()
+        return done
+
+    def run_until(self, until):
+        """
+        Process every event up to and including clock time `until`, leaving
+        later events in the event list, and move the clock to `until` (or to
+        the end of the run, if that comes first).
+        """
+        if until < self.clock:
+            raise ValueError(f'Cannot run back to {until} from {self.clock}')
+        while self.running:
+            event = self.event_list.peek()
+            if event is None or event.time > until:
+                # Nothing happens until the next event, so the state at
+                # `until` is the current one
+                self.clock = until
+                return
+            self.time_advance()
+        self.close()
+
+    def snapshots(self, times):
+        """
+        Generator running the simulation forward and yielding snapshot() at
+        each of the given clock times, in increasing order. Stops after the
+        end of the run.
+        """
+        for time in times:
+            self.run_until(time)
+            yield self.snapshot()
+            if not self.running:
+                return
+
+    def snapshot(self):
+        """
+        Return the current state as a flat dict: clock, events processed,
+        buffer lengths, blocked and busy flags, time blocked and products
+        made. summary() gives the KPIs so far.
+        """
+        state = {'time': self.clock, 'events': self.event_count}
+        for w in self.workstations:
+            for t, buffer in w.buffers.items():
+                state[f'{w.id}_{t.name}_Q'] = buffer.count
+        for i in self.inspectors:
+            state[f'blocked_{i.id}'] = self.time_blocked(i)
+            state[f'{i.id}_is_blocked'] = i.blocked_since is not None
+        for p, n in zip(self.model.products, self.products_made):
+            state[f'total_{p.name}'] = n
+        for w in self.workstations:
+            state[f'{w.id}_busy'] = w.busy
+        return state
+
+    def close(self):
+        """
+        Flush and close the CSV log, if there is one. Safe to call more than
+        once.
+        """
+        if self.log is not None:
+            self.log.close()
 
     def time_advance(self):
         """
@@ -158,50 +252,54 @@ class System():
         """
         next_event = self.event_list.get()
         self.clock = next_event.time
-        self.print_current_state_beforeproc(next_event)
-
-        if isinstance(next_event, EndInspectionEvent):
-            self.event_inspection(next_event)
-        elif isinstance(next_event, EndAssemblyEvent):
-            self.event_assembly(next_event)
-        elif isinstance(next_event, EndSimulationEvent):
-            self.event_end()
-
-        # Update blocked times
-        for ins in self.blocked_inspectors:
-            if ins.is_blocked():
-                ins.time_blocked += (self.clock - ins.last_event_time)
-                ins.last_event_time = self.clock
-
-        self.print_inspectors()
-        self.print_workstations()
-        self.print_event_list()
-
-        self.print_current_state_afterproc(None)
-
-        stats = {
-            'time': round(self.clock, 4),
-            'blocked_IN1': round(self.get_inspector_by_id('IN1').time_blocked, 4),
-            'blocked_IN2': round(self.get_inspector_by_id('IN2').time_blocked, 4),
-            'total_P1': self.num_P1,
-            'total_P2': self.num_P2,
-            'total_P3': self.num_P3
-        }
-
-        self.log.write_data(stats)
+        self.event_count += 1
+        # Decide once per event whether it is traced, so disabled sinks cost
+        # nothing beyond this call
+        tracing = self.trace.accepts(self.clock)
+
+        self.handlers[next_event.kind](next_event)
+
+        if tracing:
+            self.print_state(next_event)
+        if self.recorder is not None:
+            self.record_state()
+
+        if self.log is not None:
+            stats = [round(self.clock, 4)]
+            for i in self.inspectors:
+                stats.append(round(self.time_blocked(i), 4))
+            stats.extend(self.products_made)
+            self.log.write_row(stats)
+
+        if not self.running:
+            # The end-of-simulation row is the last one, flush everything
+            self.export_state()
+            if self.log is not None:
+                self.log.close()
+
+        # Nothing refers to the event any more
+        self.event_pool.release(next_event)
 
     def schedule_event(self, event):
         """
-        Put an event into the future event list.
+        Put an event into the future event list. Returns a handle that can be
+        passed to cancel_event().
         """
-        self.event_list.put(event)
+        return self.event_list.put(event)
+
+    def cancel_event(self, handle):
+        """
+        Remove a scheduled event from the future event list.
+        """
+        self.event_list.cancel(handle)
 
     def schedule_inspection(self, inspector, time):  # LBS： done
         """
         Schedule an end-of-inspection event for the given instructor at the
         specified time.
         """
-        self.schedule_event(EndInspectionEvent(time, inspector.id))
+        self.schedule_event(
+            self.event_pool.acquire(time, INSPECTION, inspector.index))
 
     def schedule_workstation(self, workstation, time):  # LBS： Done
         """
@@ -209,111 +307,96 @@ class System():
         specified time.
         """
         if workstation.all_components_ready() and workstation.busy == False:
-            self.schedule_event(EndAssemblyEvent(time, workstation.id))
+            self.schedule_event(
+                self.event_pool.acquire(time, ASSEMBLY, workstation.index))
             workstation.busy = True
+            self.kpi.busy[workstation.index].update(self.clock, 1)
 
             # LBS： take required components from buffer
             for comp in workstation.buffers.keys():
                 workstation.get_buffer(comp).dequeue()
 
-            # LBS Modify
-            released_inspectors = self.blocked_inspectors
-            for i in self.blocked_inspectors:
-                if i.output_component() == True:
-                    comp = i.component
-                    time = i.generate_time(self.clock, comp)
-                    self.schedule_inspection(i, time)
-                    released_inspectors.remove(i)
-
-            # update the blocked_inspectors after output_component action LBS ADD
-            self.blocked_inspectors = released_inspectors
+            # Blocked inspectors waiting on the buffers just dequeued can
+            # now push their components
+            self.wake_inspectors()
 
     def event_inspection(self, event):
         """
         Event subroutine for an end-of-inspection event.
         LBS: 1) the event_inspection function may cause endassembly event and thus cause corresponding buffer Queue empty.
         """
-        ins = self.get_inspector_by_id(event.id)
-        # If the inspector is blocked, do nothing
-        if ins.is_blocked():
-            # ins.time_blocked += self.clock - ins.last_event_time
-            self.blocked_inspectors.append(ins)  # LBS ADD
-
-        # Otherwise, have the inspector draw a new part and schedule an
-        # end-of-inspection event normally.
-        else:
-            ins.output_component()  # Inside the out_component, the Endassmbling event is scheduled
+        ins = self.inspectors[event.index]
+        # Have the inspector push its component (this may schedule an
+        # end-of-assembly event) and, if it could, draw a new part and
+        # schedule an end-of-inspection event normally.
+        if ins.output_component():
             comp = ins.component
             time = ins.generate_time(self.clock, comp)
             self.schedule_inspection(ins, time)
-
-        ins.last_event_time = self.clock
+        # Otherwise it is blocked until a slot frees up
+        else:
+            self.block_inspector(ins)
 
     def event_assembly(self, event):
         """
         Event subroutine for an end-of-assembly event.
         """
-        wrk = self.get_workstation_by_id(event.id)
+        wrk = self.workstations[event.index]
         # If the workstation has all the needed parts available in its queues,
         # have it assemble and output a product.
-        # The workstation will also alert blocked inspectors (that are holding a relevant component) that it has
-        # consumed a component; the inspectors will push their component and
-        # become unblocked.
-
-       
-
+        # Taking the parts frees buffer slots, which wakes any blocked
+        # inspectors waiting on them (see schedule_workstation).
         wrk.assemble()  # complete assembling
+        self.kpi.busy[wrk.index].update(self.clock, int(wrk.busy))
 
-        if event.id == 'WS1':
-            self.num_P1 += 1
-        elif event.id == 'WS2':
-            self.num_P2 += 1
-        elif event.id == 'WS3':
-            self.num_P3 += 1
-
-        released_inspectors = self.blocked_inspectors
-        for i in self.blocked_inspectors:
-            if i.output_component() == True:
-                comp = i.component
-                time = i.generate_time(self.clock, comp)
-                self.schedule_inspection(i, time)
-                released_inspectors.remove(i)
-            # Otherwise, do nothing 
+        self.products_made[wrk.product_index] += 1
 
-        # update the blocked_inspectors after output_component action
-        self.blocked_inspectors = released_inspectors
-
-
-    def event_end(self):
+    def event_end(self, event):
         """
         Event subroutine for an end-of-simulation event.
         """
-        print('Simulation End')
+        self.trace.write('Simulation End')
         self.running = False
+        # Charge inspectors still blocked up to the end of the run
+        for ins in self.blocked_inspectors:
+            ins.time_blocked = self.time_blocked(ins)
+            ins.blocked_since = self.clock
+        # Freeze the KPIs at the end of the run
+        self.kpis = self.kpi.summary(self.clock, self.products_made)
         self.print_final_statistics()
-        self.write_excel_xls_save(self.logfile)  # save logfile
 
+    def event_warmup(self, event):
+        """
+        Event subroutine for the end of the warm-up period: discard the KPIs
+        accumulated so far, so they only cover the steady state.
+        """
+        self.trace.write('Warm-up period over')
+        self.kpi.reset(self.clock, self.products_made,
+                       [self.time_blocked(i) for i in self.inspectors])
+
+    def print_state(self, curr_event):
+        """
+        Write the full system state around the given event to the trace sink.
+        """
+        self.print_current_state_beforeproc(curr_event)
+        self.print_inspectors()
+        self.print_workstations()
+        self.print_event_list()
+        self.print_current_state_afterproc(curr_event)
 
     def print_event_list(self):
         tuples = list()
-        tmpstr = ""
-        for e in sorted(self.event_list.queue):
-            tuples.append((e.time, e.id))
-            tmpstr += "["+str(e.time) + ":" + str(e.id)+"] "
+        for e in self.event_list.snapshot():
+            tuples.append((e.time, self.event_name(e)))
 
-        print(f'Event list: {tuples}')
-        self.write_excel_xls_append(tmpstr, self.EventListColumn)
+        self.trace.write(f'Event list: {tuples}')
 
     def print_inspectors(self):
         tuples = list()
         for i in self.inspectors:
             tuples.append((i.id, i.component.name))
 
-        print(f'Inspectors: {tuples}')
-        self.write_excel_xls_append(
-            self.inspectors[0].component.name, self.Inspector1Column)
-        self.write_excel_xls_append(
-            self.inspectors[1].component.name, self.Inspector2Column)
+        self.trace.write(f'Inspectors: {tuples}')
 
     def print_workstations(self):
         tuples = list()
@@ -323,106 +406,331 @@ class System():
                 tuples.append((w.id, buffer.component_type.name,
                                f'In queue: {buffer.get_length()}'))
 
-                if w.id == 'WS1' and buffer.component_type.name == 'C1':
-                    self.write_excel_xls_append(
-                        buffer.get_length(), self.WS1_C1_Q_Column)
-                if w.id == 'WS2' and buffer.component_type.name == 'C1':
-                    self.write_excel_xls_append(
-                        buffer.get_length(), self.WS2_C1_Q_Column)
-                if w.id == 'WS2' and buffer.component_type.name == 'C2':
-                    self.write_excel_xls_append(
-                        buffer.get_length(), self.WS2_C2_Q_Column)
-                if w.id == 'WS3' and buffer.component_type.name == 'C1':
-                    self.write_excel_xls_append(
-                        buffer.get_length(), self.WS3_C1_Q_Column)
-                if w.id == 'WS3' and buffer.component_type.name == 'C3':
-                    self.write_excel_xls_append(
-                        buffer.get_length(), self.WS3_C3_Q_Column)
-
-        print(f'Workstations: {tuples}')
+        self.trace.write(f'Workstations: {tuples}')
 
     def print_current_state_beforeproc(self, curr_event):
-        print(f'Time: {self.clock}')
-
-        self.rows_old = self.rows_old + 1
-
-        self.write_excel_xls_append(str(self.clock), self.TimeColumn)
+        self.trace.write(f'Time: {self.clock}')
 
         if curr_event:
-            print(f'Current event: ({curr_event.time}, {curr_event.id})')
-            self.write_excel_xls_append(
-                str(curr_event.time) + ":" + str(curr_event.id), self.CurrentEventColumn)
-
+            self.trace.write(
+                f'Current event: ({curr_event.time}, {self.event_name(curr_event)})')
 
     def print_current_state_afterproc(self, curr_event):
-        self.write_excel_xls_append(
-            str(round(self.get_inspector_by_id('IN1').time_blocked, 4)), self.BLOCKED_IN1)
-        self.write_excel_xls_append(
-            str(round(self.get_inspector_by_id('IN2').time_blocked, 4)), self.BLOCKED_IN2)
-        self.write_excel_xls_append(str(self.num_P1), self.NUM_P1)
-        self.write_excel_xls_append(str(self.num_P2), self.NUM_P2)
-        self.write_excel_xls_append(str(self.num_P3), self.NUM_P3)
-        tmpstr = ""
-        if len(self.blocked_inspectors) > 0:
-            for bi in self.blocked_inspectors:
-                tmpstr = tmpstr + "[" + str(bi.get_id()) + "]"
-
-        self.write_excel_xls_append(tmpstr, self.BLOCK_INS_LIST)
-
-        self.write_excel_xls_append(
-            str(self.workstations[0].busy), self.WS1_BUSY)
-        self.write_excel_xls_append(
-            str(self.workstations[1].busy), self.WS2_BUSY)
-        self.write_excel_xls_append(
-            str(self.workstations[2].busy), self.WS3_BUSY)
-    print('------')
+        self.trace.write('------')
 
     def print_final_statistics(self):
-        print(
-            f'P1: {self.num_P1}, P2: {self.num_P2}, P3: {self.num_P3}, Total: {self.num_P1 + self.num_P2 + self.num_P3}')
-        print(f'Total time blocked:')
+        counts = [f'{p.name}: {n}' for p, n in
+                  zip(self.model.products, self.products_made)]
+        self.trace.write(
+            f"{', '.join(counts)}, Total: {sum(self.products_made)}")
+        self.trace.write(f'Total time blocked:')
         for i in self.inspectors:
-            percentage = round(100 * i.time_blocked / END_TIME, 4)
-            print(f'{i.id}: {i.time_blocked} seconds ({percentage}%)')
+            percentage = round(100 * i.time_blocked / self.spec.end_time, 4)
+            self.trace.write(f'{i.id}: {i.time_blocked} seconds ({percentage}%)')
+
+    def summary(self):
+        """
+        Return the headline results of this replication as a dict.
+        """
+        results = {
+            'replication': self.replication_id,
+            'master_seed': self.streams.master_seed,
+        }
+        # Like the KPIs, totals only count what happened after the warm-up
+        for p, n, offset in zip(self.model.products, self.products_made,
+                                self.kpi.products_offset):
+            results[f'total_{p.name}'] = n - offset
+        for i, offset in zip(self.inspectors, self.kpi.blocked_offset):
+            results[f'blocked_{i.id}'] = self.time_blocked(i) - offset
+        if self.kpis is not None:
+            results.update(self.kpis)
+        else:
+            results.update(self.kpi.summary(self.clock, self.products_made))
+        return results
+
+    def block_inspector(self, ins):
+        """
+        Mark an inspector as blocked and subscribe it to every buffer it
+        could push its component to.
+        """
+        if ins.blocked_since is None:
+            ins.blocked_since = self.clock
+            self.blocked_inspectors.append(ins)
+            self.kpi.blocked[ins.index].update(self.clock, 1)
+        for w in ins.router.candidates[ins.component]:
+            self.waiting[w.buffers[ins.component].index].append(ins)
+
+    def wake_inspectors(self):
+        """
+        Retry the inspectors woken by buffers getting free slots, in the order
+        they were woken. An inspector that can push its component is charged
+        its blocked time and goes back to inspecting; one that still cannot
+        (its routing policy chose a full buffer) waits again.
+        """
+        if self.waking:
+            # Called again while pushing a component; the loop below picks
+            # up any new wakeups
+            return
+        self.waking = True
+        try:
+            n = 0
+            while n < len(self.wakeups):
+                ins = self.wakeups[n]
+                n += 1
+                if ins.output_component():
+                    ins.time_blocked = self.time_blocked(ins)
+                    ins.blocked_since = None
+                    self.blocked_inspectors.remove(ins)
+                    self.kpi.blocked[ins.index].update(self.clock, 0)
+                    time = ins.generate_time(self.clock, ins.component)
+                    self.schedule_inspection(ins, time)
+                else:
+                    self.block_inspector(ins)
+            self.wakeups.clear()
+        finally:
+            self.waking = False
+
+    def time_blocked(self, ins):
+        """
+        Total time the inspector has been blocked, up to the current time.
+        """
+        if ins.blocked_since is None:
+            return ins.time_blocked
+        return ins.time_blocked + self.clock - ins.blocked_since
+
+    def buffer_changed(self, buffer):
+        """
+        Buffer monitor: update the buffer's time-weighted length and the
+        routing indexes over it, and wake the inspectors waiting on it if it
+        has a free slot.
+        """
+        self.kpi.queue[buffer.index].update(self.clock, buffer.count)
+        for router in self.routers[buffer.index]:
+            router.buffer_changed(buffer)
+        waiting = self.waiting[buffer.index]
+        if waiting and buffer.count < buffer.capacity:
+            for ins in waiting:
+                # Unsubscribe from the other buffers it was waiting on
+                for w in ins.router.candidates[ins.component]:
+                    other = w.buffers[ins.component]
+                    if other is not buffer:
+                        self.waiting[other.index].remove(ins)
+                self.wakeups.append(ins)
+            waiting.clear()
+
+    def log_columns(self):
+        """
+        Column names of the per-event CSV log.
+        """
+        columns = ['time']
+        for i in self.inspectors:
+            columns.append(f'blocked_{i.id}')
+        for p in self.model.products:
+            columns.append(f'total_{p.name}')
+        return columns
+
+    def state_columns(self):
+        """
+        Describe the columns of the per-event state snapshot as (name,
+        typecode) pairs for the StateRecorder.
+        """
+        columns = [('time', 'd')]
+        for i in self.inspectors:
+            columns.append((f'{i.id}_component', 'B'))
+        for w in self.workstations:
+            for t in w.buffers.keys():
+                columns.append((f'{w.id}_{t.name}_Q', 'q'))
+        for i in self.inspectors:
+            columns.append((f'blocked_{i.id}', 'd'))
+            columns.append((f'{i.id}_is_blocked', 'B'))
+        for p in self.model.products:
+            columns.append((f'num_{p.name}', 'q'))
+        for w in self.workstations:
+            columns.append((f'{w.id}_busy', 'B'))
+        return columns
+
+    def record_state(self):
+        """
+        Append the current system state to the state recorder.
+        """
+        values = [self.clock]
+        for i in self.inspectors:
+            values.append(i.component.value)
+        for buffer in self.model.buffers:
+            values.append(buffer.get_length())
+        for i in self.inspectors:
+            values.append(self.time_blocked(i))
+            values.append(i.blocked_since is not None)
+        values.extend(self.products_made)
+        for w in self.workstations:
+            values.append(w.busy)
+        self.recorder.record(values)
+
+    def export_state(self):
+        """
+        Write the recorded state table out in each requested format.
+        """
+        for fmt in self.exports:
+            path = self.export_paths[fmt]
+            self.recorder.export(fmt, path)
+            self.trace.write(f'{fmt} saved: {path}')
+
+    def event_name(self, event):
+        """
+        Return the ID string of the inspector or workstation an event belongs
+        to, or 'END' / 'WARMUP' for the end-of-simulation and end-of-warm-up
+        events.
+        """
+        if event.kind == INSPECTION:
+            return self.inspectors[event.index].id
+        elif event.kind == ASSEMBLY:
+            return self.workstations[event.index].id
+        elif event.kind == WARMUP:
+            return 'WARMUP'
+        return 'END'
 
     def get_inspector_by_id(self, id):
         """
         Find and return an inspector with the given ID string
         """
-        for i in self.inspectors:
-            if i.id == id:
-                return i
+        index = self.model.inspector_index.get(id)
+        if index is not None:
+            return self.inspectors[index]
 
     def get_workstation_by_id(self, id):
         """
         Find and return an workstation with the given ID string
         """
-        for w in self.workstations:
-            if w.id == id:
-                return w
-
-    def write_excel_xls_append(self, value, j):
-        self.worksheet.write(self.rows_old, j, value)
-
-    def write_excel_xls_save(self, file):
-        self.workbook.save(file)
-        print("xls saved")
-
-# if __name__ == '__main__':
-#
-#     replication_number = sys.argv[1]
-# 	for curr_replication in range(replication_number):
-# 	    # Initialize a system
-# 	    sys = System(replication_number)
-# 	    # sys = System(50)
-# 	    while (sys.running):
-# 	        sys.time_advance()
-if __name__ == '__main__':
-    replication_number = int(sys.argv[1])
+        index = self.model.workstation_index.get(id)
+        if index is not None:
+            return self.workstations[index]
 
-    for curr_replication in range(replication_number):
-        # Initialize a system
-        sys = System(curr_replication)
 
-        while (sys.running):
-            sys.time_advance()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the manufacturing '
+                                     'facility simulation.')
+    parser.add_argument('replications', type=int,
+                        help='number of replications to run (the most to '
+                        'run, with --precision)')
+    parser.add_argument('--model', default=None, metavar='PATH',
+                        help='JSON or TOML model spec to simulate (default: '
+                        'the built-in project model)')
+    parser.add_argument('--trace', choices=TRACE_KINDS, default=None,
+                        help='where to send the per-event state trace; '
+                        '"none" runs headless, "file" writes one trace per '
+                        'replication to log/trace (default: console with one '
+                        'worker, none with more)')
+    parser.add_argument('--trace-every', type=int, default=1, metavar='N',
+                        help='only trace every N-th event')
+    parser.add_argument('--trace-window', type=float, nargs=2, default=None,
+                        metavar=('START', 'END'),
+                        help='only trace events between these clock times')
+    parser.add_argument('--export', choices=EXPORT_FORMATS, nargs='*',
+                        default=['xls'],
+                        help='formats to export the per-event state table '
+                        'to after each replication (default: xls)')
+    parser.add_argument('--fel', choices=sorted(FEL_TYPES), default='heap',
+                        help='future event list implementation '
+                        '(default: heap)')
+    parser.add_argument('--vectorized-rng', action='store_true',
+                        help='generate service times in NumPy blocks')
+    parser.add_argument('--no-event-log', dest='event_log',
+                        action='store_false',
+                        help='do not write the per-event CSV log')
+    parser.add_argument('--log-background', action='store_true',
+                        help='write the CSV log from a background thread')
+    parser.add_argument('--warmup', type=float, default=0.0, metavar='TIME',
+                        help='discard KPIs collected before this clock time '
+                        '(see warmup.py; default: 0)')
+    parser.add_argument('--antithetic', action='store_true',
+                        help='run replications in antithetic pairs (0 and 1, '
+                        '2 and 3, ...)')
+    parser.add_argument('--instrument', action='store_true',
+                        help='time every event handler, routing decision and '
+                        'log call, and write a report per replication to '
+                        'log/profile')
+    parser.add_argument('--profile', choices=PROFILE_KINDS, default=None,
+                        help='also capture a cProfile or tracemalloc profile '
+                        'of each replication into its report')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes to run replications '
+                        'on (default: 1, 0 uses every core)')
+    parser.add_argument('--precision', type=float, default=None,
+                        metavar='REL',
+                        help='run replications in batches until every KPI '
+                        'confidence interval half-width is at most REL times '
+                        'its mean')
+    parser.add_argument('--absolute-precision', type=float, default=0.0,
+                        metavar='ABS',
+                        help='with --precision, also accept a KPI whose '
+                        'half-width is at most ABS, for KPIs with a mean '
+                        'near 0 (default: 0, off)')
+    parser.add_argument('--kpis', nargs='+', default=None, metavar='PATTERN',
+                        help='KPIs --precision applies to (default: '
+                        'throughput_* blocked_fraction_*)')
+    parser.add_argument('--batch', type=int, default=10,
+                        help='replications per batch with --precision '
+                        '(default: 10)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='confidence level for --precision '
+                        '(default: 0.95)')
+    parser.add_argument('--seed', type=int, default=rng_seed,
+                        help='master seed every random stream is derived '
+                        'from (default: random)')
+    args = parser.parse_args()
+    if args.trace is None:
+        args.trace = 'console' if args.workers == 1 else 'none'
+    elif args.trace == 'console' and args.workers != 1:
+        # Traces from several processes would interleave on stdout
+        parser.error('--trace console needs --workers 1; use --trace file '
+                     'for one trace per replication')
+
+    # Imported here because runner imports System from this module
+    from runner import SEQUENTIAL_KPIS, ReplicationRunner
+
+    spec = load_spec(args.model) if args.model else default_spec()
+    runner = ReplicationRunner(
+        spec,
+        workers=args.workers,
+        master_seed=args.seed,
+        trace=args.trace,
+        trace_every=args.trace_every,
+        trace_window=args.trace_window,
+        log_background=args.log_background,
+        exports=args.export,
+        fel=args.fel,
+        vectorized_rng=args.vectorized_rng,
+        event_log=args.event_log,
+        warmup=args.warmup,
+        antithetic=args.antithetic,
+        instrument=args.instrument,
+        profile=args.profile)
+    # Drawn at random without --seed; printed so any replication can be rerun
+    print(f'Master seed: {runner.master_seed}')
+
+    def print_result(result):
+        # Whatever products the model makes
+        totals = [f'{name[len("total_"):]}: {value}'
+                  for name, value in result.items()
+                  if name.startswith('total_')]
+        print(f"Replication {result['replication']} done: "
+              f"{', '.join(totals)}")
+
+    if args.precision is None:
+        # Results arrive in completion order, not replication order
+        for result in runner.run(range(args.replications)):
+            print_result(result)
+        sys.exit()
+
+    for results, report in runner.run_sequential(
+            args.precision, args.kpis or SEQUENTIAL_KPIS, args.batch,
+            args.confidence, args.replications, args.absolute_precision):
+        for result in results:
+            print_result(result)
+    status = 'reached' if report.met() else 'not reached'
+    samples = f' ({report.count} pairs)' if report.paired else ''
+    print(f'Target relative precision {args.precision} {status} after '
+          f'{report.replications} replications{samples} '
+          f'({args.confidence:.0%} confidence):')
+    for line in report.lines():
+        print(f'  {line}')
@@ -0,0 +1,130 @@
+class TraceSink:
+    """
+    Destination for the human-readable state trace produced by System.
+
+    The base sink discards everything and never accepts an event, so a run
+    using it does not format any trace output at all. Subclasses either write
+    the trace somewhere or wrap another sink to sample which events are traced.
+    """
+
+    def accepts(self, clock):
+        """
+        Return True if the event being processed at the given clock time
+        should have its state traced.
+        """
+        return False
+
+    def write(self, line):
+        """
+        Write a single line of trace output.
+        """
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleTraceSink(TraceSink):
+    """
+    Print every event's state to stdout (the original verbose behaviour).
+    """
+
+    def accepts(self, clock):
+        return True
+
+    def write(self, line):
+        print(line)
+
+
+class FileTraceSink(TraceSink):
+    """
+    Write every event's state to a text file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w')
+
+    def accepts(self, clock):
+        return True
+
+    def write(self, line):
+        self.file.write(line + '\n')
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+class EveryNthTraceSink(TraceSink):
+    """
+    Wrap another sink so that only every n-th accepted event is traced.
+    """
+
+    def __init__(self, sink, n):
+        if n < 1:
+            raise ValueError('Trace interval must be at least 1')
+        self.sink = sink
+        self.n = n
+        self.count = 0
+
+    def accepts(self, clock):
+        if not self.sink.accepts(clock):
+            return False
+        self.count += 1
+        return (self.count - 1) % self.n == 0
+
+    def write(self, line):
+        self.sink.write(line)
+
+    def close(self):
+        self.sink.close()
+
+
+class TimeWindowTraceSink(TraceSink):
+    """
+    Wrap another sink so that only events with start <= clock <= end are
+    traced.
+    """
+
+    def __init__(self, sink, start, end):
+        self.sink = sink
+        self.start = start
+        self.end = end
+
+    def accepts(self, clock):
+        return self.start <= clock <= self.end and self.sink.accepts(clock)
+
+    def write(self, line):
+        self.sink.write(line)
+
+    def close(self):
+        self.sink.close()
+
+
+TRACE_KINDS = ('none', 'console', 'file')
+
+
+def make_trace_sink(kind='none', path=None, every=1, window=None):
+    """
+    Build a trace sink from command-line style options.
+    kind is one of TRACE_KINDS, path is required for file sinks, every samples
+    every n-th event and window is an optional (start, end) pair of clock
+    times.
+    """
+    if kind == 'none':
+        return TraceSink()
+    elif kind == 'console':
+        sink = ConsoleTraceSink()
+    elif kind == 'file':
+        if path is None:
+            raise ValueError('A file trace sink needs a path')
+        sink = FileTraceSink(path)
+    else:
+        raise ValueError(f'Unknown trace sink: {kind}')
+
+    if window is not None:
+        sink = TimeWindowTraceSink(sink, window[0], window[1])
+    if every > 1:
+        sink = EveryNthTraceSink(sink, every)
+    return sink
@@ -0,0 +1,141 @@
+import argparse
+import fnmatch
+import random
+
+from config import default_spec, load_spec, parse_override
+from moments import RunningMoments
+from runner import SEQUENTIAL_KPIS, ReplicationRunner
+
+VR_MODES = ('crn', 'antithetic')
+
+
+def _by_replication(runner, replication_ids):
+    return {r['replication']: r for r in runner.run(replication_ids)}
+
+
+def _kpi_names(summary, kpis):
+    return [name for name in summary
+            if any(fnmatch.fnmatchcase(name, p) for p in kpis)]
+
+
+def _report(moments, variance_vr, variance_independent, confidence):
+    half = moments.half_width(confidence)
+    return {
+        'mean': moments.mean,
+        'half_width': half,
+        'variance': variance_vr,
+        'variance_independent': variance_independent,
+        # Fraction of the variance removed compared with independent sampling
+        'reduction': (1 - variance_vr / variance_independent
+                      if variance_independent > 0 else 0.0),
+    }
+
+
+def crn_comparison(spec_a, spec_b, replications, kpis=SEQUENTIAL_KPIS,
+                   master_seed=None, workers=1, confidence=0.95):
+    """
+    Estimate the difference in KPIs between two configurations (A - B) with
+    common random numbers: replication r of both configurations is run from
+    the same master seed, so every entity draws the same random streams.
+
+    Returns a dict per KPI with the mean difference, its confidence
+    interval half-width, the variance of one paired difference and the
+    variance the difference would have with independent runs (the sum of
+    the two configurations' variances), and the fraction saved.
+    """
+    if master_seed is None:
+        master_seed = random.SystemRandom().getrandbits(64)
+    runs = list()
+    for spec in (spec_a, spec_b):
+        runner = ReplicationRunner(spec, workers, master_seed,
+                                   event_log=False)
+        runs.append(_by_replication(runner, range(replications)))
+    a, b = runs
+
+    results = dict()
+    for name in _kpi_names(a[0], kpis):
+        diff, moments_a, moments_b = (RunningMoments(), RunningMoments(),
+                                      RunningMoments())
+        for r in range(replications):
+            diff.add(a[r][name] - b[r][name])
+            moments_a.add(a[r][name])
+            moments_b.add(b[r][name])
+        results[name] = _report(
+            diff, diff.variance(),
+            moments_a.variance() + moments_b.variance(), confidence)
+    return results
+
+
+def antithetic_estimate(spec, pairs, kpis=SEQUENTIAL_KPIS, master_seed=None,
+                        workers=1, confidence=0.95):
+    """
+    Estimate the KPIs of one configuration from antithetic pairs of
+    replications (see System's antithetic option).
+
+    Returns a dict per KPI with the mean, its confidence interval
+    half-width, the variance of one pair's average, the variance the average
+    of two independent replications would have (half the variance of one
+    replication), and the fraction saved.
+    """
+    runner = ReplicationRunner(spec, workers, master_seed, event_log=False,
+                               antithetic=True)
+    runs = _by_replication(runner, range(2 * pairs))
+
+    results = dict()
+    for name in _kpi_names(runs[0], kpis):
+        pair_means, single = RunningMoments(), RunningMoments()
+        for k in range(pairs):
+            x, y = runs[2 * k][name], runs[2 * k + 1][name]
+            pair_means.add((x + y) / 2)
+            single.add(x)
+            single.add(y)
+        results[name] = _report(pair_means, pair_means.variance(),
+                                single.variance() / 2, confidence)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Estimate KPIs with variance reduction and report the '
+        'variance saved compared with independent sampling.')
+    parser.add_argument('mode', choices=VR_MODES,
+                        help='crn: compare the model with a variant using '
+                        'common random numbers; antithetic: estimate the '
+                        'model from antithetic pairs')
+    parser.add_argument('replications', type=int,
+                        help='replications per configuration (crn) or '
+                        'antithetic pairs')
+    parser.add_argument('--model', default=None, metavar='PATH',
+                        help='model spec (default: the built-in model)')
+    parser.add_argument('--set', nargs='+', default=list(), dest='overrides',
+                        metavar='PATH=VALUE',
+                        help='parameters that differ in the variant compared '
+                        'with crn, e.g. inspectors.IN1.routing=SHORTEST_QUEUE')
+    parser.add_argument('--kpis', nargs='+', default=SEQUENTIAL_KPIS,
+                        metavar='PATTERN',
+                        help='KPIs to report (default: throughput_* '
+                        'blocked_fraction_*)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='worker processes (default: 0, every core)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='master seed (default: random)')
+    args = parser.parse_args()
+
+    spec = load_spec(args.model) if args.model else default_spec()
+    if args.mode == 'crn':
+        if not args.overrides:
+            parser.error('crn needs the variant to compare with (--set)')
+        variant = spec.with_overrides(
+            dict(parse_override(o) for o in args.overrides))
+        results = crn_comparison(spec, variant, args.replications, args.kpis,
+                                 args.seed, args.workers)
+        print('Difference, model - variant, with common random numbers:')
+    else:
+        results = antithetic_estimate(spec, args.replications, args.kpis,
+                                      args.seed, args.workers)
+        print('Estimate from antithetic pairs:')
+
+    for name, r in results.items():
+        print(f"  {name}: {r['mean']:.6g} +/- {r['half_width']:.3g}, "
+              f"variance {r['variance']:.3g} vs {r['variance_independent']:.3g}"
+              f" independent ({r['reduction']:.1%} saved)")
@@ -0,0 +1,129 @@
+import argparse
+import os
+
+import numpy as np
+
+from statistics import SIM_DURATION, TIME_STEP, summarize_logs
+
+# Number of bins averaged into each batch by MSER-5
+MSER_BATCH = 5
+WARMUP_METHODS = ('mser', 'welch')
+
+
+def welch_average(series, window):
+    """
+    Welch's moving average of a series (already averaged across
+    replications): point i is the mean of the 2*window + 1 points centred on
+    it, or of the 2*i + 1 points available near the start. Only points with
+    a full window on the right are returned.
+    """
+    series = np.asarray(series, dtype=float)
+    n = len(series) - window
+    if n <= 0:
+        raise ValueError('Series is too short for the moving average window')
+    sums = np.concatenate(([0.0], np.cumsum(series)))
+    half = np.minimum(np.arange(n), window)
+    lows = np.arange(n) - half
+    highs = np.arange(n) + half + 1
+    return (sums[highs] - sums[lows]) / (highs - lows)
+
+
+def welch_truncation(series, window, tolerance=0.05):
+    """
+    Recommend a truncation point (in bins) from Welch's moving average: the
+    first point at which the average comes within a relative tolerance of
+    its mean over the second half of the run.
+    """
+    smoothed = welch_average(series, window)
+    level = smoothed[len(smoothed) // 2:].mean()
+    inside = np.abs(smoothed - level) <= tolerance * abs(level)
+    if not inside.any():
+        raise ValueError('Moving average never settles; use longer runs or '
+                         'a wider window')
+    return int(np.flatnonzero(inside)[0])
+
+
+def mser_truncation(series, batch=MSER_BATCH):
+    """
+    Recommend a truncation point (in bins) with the MSER rule: the number of
+    leading observations to delete that minimizes the squared standard error
+    of the mean of what is left. Observations are first averaged in batches
+    of `batch` (MSER-5 by default), and at most half the run is deleted.
+    """
+    series = np.asarray(series, dtype=float)
+    nbatches = len(series) // batch
+    if nbatches < 2:
+        raise ValueError('Series is too short for MSER')
+    means = series[:nbatches * batch].reshape(nbatches, batch).mean(axis=1)
+    # Sums and sums of squares of the batch means from each d to the end
+    tail_sum = np.cumsum(means[::-1])[::-1]
+    tail_sq = np.cumsum((means ** 2)[::-1])[::-1]
+    remaining = nbatches - np.arange(nbatches)
+    sse = tail_sq - tail_sum ** 2 / remaining
+    stat = sse / remaining ** 2
+    d = int(np.argmin(stat[:nbatches // 2 + 1]))
+    return d * batch
+
+
+def recommend_warmup(series, bin_width=TIME_STEP, method='mser', window=5,
+                     tolerance=0.05):
+    """
+    Recommend a warm-up period, as a clock time, for a binned output series
+    averaged across replications (see statistics.binned_series).
+    """
+    if method == 'welch':
+        bins = welch_truncation(series, window, tolerance)
+    elif method == 'mser':
+        bins = mser_truncation(series)
+    else:
+        raise ValueError(f'Unknown warm-up method {method}')
+    return bins * bin_width
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Recommend a warm-up period from the per-event logs of '
+        'a set of pilot replications.')
+    parser.add_argument('log_dir', help='log directory of the pilot runs')
+    parser.add_argument('--method', choices=WARMUP_METHODS, default='mser',
+                        help='truncation rule (default: mser, i.e. MSER-5)')
+    parser.add_argument('--series', nargs='*', default=None,
+                        help='log columns to analyse (default: every '
+                        'total_* and blocked_* column)')
+    parser.add_argument('--bin-width', type=float, default=TIME_STEP,
+                        help=f'width of the time bins (default: {TIME_STEP})')
+    parser.add_argument('--duration', type=float, default=SIM_DURATION,
+                        help=f'simulated time covered by the bins '
+                        f'(default: {SIM_DURATION})')
+    parser.add_argument('--window', type=int, default=5,
+                        help="Welch's moving average half-width in bins "
+                        '(default: 5)')
+    parser.add_argument('--tolerance', type=float, default=0.05,
+                        help="relative tolerance for Welch's method "
+                        '(default: 0.05)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='worker processes (default: 0, every core)')
+    args = parser.parse_args()
+
+    csv_dir = os.path.join(args.log_dir, 'csv')
+    paths = sorted(os.path.join(csv_dir, f) for f in os.listdir(csv_dir))
+    summary = summarize_logs(paths, args.bin_width, args.duration,
+                             args.workers)
+    names = args.series or summary.columns
+
+    recommended = 0.0
+    for name in names:
+        series = summary.bins.mean[:, summary.columns.index(name)]
+        if not series.any():
+            print(f'{name}: always zero, skipped')
+            continue
+        try:
+            time = recommend_warmup(series, args.bin_width, args.method,
+                                    args.window, args.tolerance)
+        except ValueError as e:
+            print(f'{name}: {e}')
+            continue
+        print(f'{name}: truncate at {time}')
+        recommended = max(recommended, time)
+    print(f'Recommended warm-up period: {recommended} '
+          f'(pass --warmup {recommended} to system.py)')
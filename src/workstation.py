@@ -1,12 +1,12 @@
 import random
 from buffer import Buffer, BufferException
 from component import ComponentType, ProductType
-from event import EndAssemblyEvent
 from rng import generate_exp
 
 
 class Workstation:
-    def __init__(self, parent, id, lam, inputs: list, output: ProductType):
+    def __init__(self, parent, id, lam, inputs: list, output: ProductType,
+                 rng=None, sampler=None, capacities=None):
         # ID string
         self.id = id
         # busy or idle state LBS ADD
@@ -16,7 +16,9 @@ class Workstation:
         # Lambda of exponential distribution associated with this inspector
         self.lam = lam
         # Individual RNG stream for this workstation
-        self.rng = random.Random()
+        self.rng = rng if rng is not None else random.Random()
+        # Optional block-vectorized sampler that replaces rng for assembly times
+        self.sampler = sampler
 
         # Type of product this station assembles
         self.output_type = output
@@ -24,12 +26,17 @@ class Workstation:
         self.buffers = dict()
         self.ready_components = dict()  # LBS: not used
         for comp in inputs:
-            self.buffers[comp] = Buffer(comp)
+            if capacities is not None and comp in capacities:
+                self.buffers[comp] = Buffer(comp, capacities[comp])
+            else:
+                self.buffers[comp] = Buffer(comp)
 
     def generate_time(self, base_time):
         """
         Calculate a time for the next assembly event.
         """
+        if self.sampler is not None:
+            return base_time + self.sampler.sample(self.lam)
         return base_time + generate_exp(self.lam, self.rng)
 
     def can_accept(self, input: ComponentType):
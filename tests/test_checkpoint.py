@@ -0,0 +1,49 @@
+import pytest
+
+from checkpoint import (CheckpointException, capture, load_checkpoint,
+                        restore, save_checkpoint)
+from config import default_spec
+from system import System
+
+
+def test_resume_matches_uninterrupted_run(tmp_path):
+    path = tmp_path / 'warm.ckpt'
+    system = System(0, master_seed=4)
+    system.run_until(400)
+    save_checkpoint(system, path)
+
+    resumed = load_checkpoint(path)
+    resumed.run()
+    uninterrupted = System(0, master_seed=4)
+    uninterrupted.run()
+    assert resumed.summary() == uninterrupted.summary()
+
+
+def test_fork_into_larger_buffers_unblocks_inspectors():
+    system = System(0, master_seed=0)
+    system.run_until(300)
+    assert system.blocked_inspectors
+    state = capture(system)
+
+    spec = default_spec().with_overrides({'buffer_capacity': 10})
+    fork = System(0, master_seed=0, spec=spec)
+    restore(fork, state)
+    # Every buffer has room now, so nobody should still be waiting
+    assert fork.blocked_inspectors == []
+    assert all(not w for w in fork.waiting)
+    assert fork.event_list.peek().time >= 300
+
+
+def test_load_checkpoint_accepts_matching_stream_options(tmp_path):
+    path = tmp_path / 'warm.ckpt'
+    system = System(0, master_seed=4, vectorized_rng=True)
+    system.run_until(400)
+    save_checkpoint(system, path)
+
+    resumed = load_checkpoint(path, vectorized_rng=True, master_seed=4)
+    resumed.run()
+    uninterrupted = System(0, master_seed=4, vectorized_rng=True)
+    uninterrupted.run()
+    assert resumed.summary() == uninterrupted.summary()
+    with pytest.raises(CheckpointException):
+        load_checkpoint(path, vectorized_rng=False)
@@ -0,0 +1,34 @@
+import pytest
+
+from config import ModelConfigError, ModelSpec, default_spec
+from routing import OutputPolicy
+
+
+@pytest.mark.parametrize('path', [
+    'end_tme',
+    'routing',
+    'workstations.WS1.lamda',
+    'inspectors.IN1.rouitng',
+    'inspectors.IN1.lambdas.C9',
+])
+def test_override_rejects_unknown_parameters(path):
+    with pytest.raises(ModelConfigError):
+        default_spec().with_overrides({path: 1})
+
+
+def test_override_creates_optional_parameters():
+    data = default_spec().to_dict()
+    del data['inspectors'][0]['routing']
+    spec = ModelSpec(data).with_overrides({
+        'inspectors.IN1.routing': 'SHORTEST_QUEUE',
+        'workstations.WS3.buffer_capacity.C3': 5,
+    })
+    assert spec.inspectors[0].routing is OutputPolicy.SHORTEST_QUEUE
+    assert spec.workstations[2].capacities[spec.workstations[2].inputs[1]] == 5
+
+
+def test_spec_rejects_unknown_keys():
+    data = default_spec().to_dict()
+    data['workstations'][0]['lamda'] = 0.5
+    with pytest.raises(ModelConfigError):
+        ModelSpec(data)
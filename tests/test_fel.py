@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from event import INSPECTION, Event
+from fel import CalendarEventList, HeapEventList
+
+
+def _run(fel, seed, steps=2000):
+    """
+    Drive an event list with a random sequence of put/get/peek calls, new
+    events never being earlier than the last one taken, and return what
+    get() and peek() returned.
+    """
+    rng = random.Random(seed)
+    clock = 0.0
+    out = list()
+    for n in range(steps):
+        op = rng.random()
+        if op < 0.45 or not fel:
+            fel.put(Event(clock + rng.expovariate(1.0), INSPECTION, n))
+        elif op < 0.75:
+            event = fel.get()
+            clock = event.time
+            out.append(('get', event.time, event.index))
+        else:
+            event = fel.peek()
+            out.append(('peek', event.time, event.index))
+    while fel:
+        event = fel.get()
+        out.append(('get', event.time, event.index))
+    return out
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_calendar_matches_heap(seed):
+    assert _run(CalendarEventList(), seed) == _run(HeapEventList(), seed)
+
+
+def test_calendar_peek_keeps_earlier_puts_in_order():
+    fel = CalendarEventList()
+    fel.put(Event(0.5, INSPECTION))
+    fel.get()
+    fel.put(Event(10.0, INSPECTION))
+    fel.peek()
+    fel.put(Event(3.0, INSPECTION))
+    assert [fel.get().time, fel.get().time] == [3.0, 10.0]
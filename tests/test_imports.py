@@ -0,0 +1,16 @@
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', 'src')
+# Modules only the features that need them may load
+LAZY_MODULES = ('numpy', 'pandas', 'matplotlib', 'xlwt', 'cProfile',
+                'pstats', 'tracemalloc')
+
+
+def test_simulator_imports_no_optional_dependencies():
+    code = ('import sys, runner; '
+            f'print([m for m in {LAZY_MODULES!r} if m in sys.modules])')
+    out = subprocess.run([sys.executable, '-c', code], cwd=SRC_DIR,
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '[]'
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from logger import Logger
+
+ROWS = [(n * 0.5, n % 3, n, n // 2) for n in range(1000)]
+COLUMNS = ('time', 'blocked_IN1', 'total_P1', 'total_P2')
+
+
+def _write(path, **kwargs):
+    log = Logger(str(path), **kwargs)
+    log.write_header(COLUMNS)
+    for row in ROWS:
+        log.write_row(row)
+    log.close()
+    return path.read_text()
+
+
+def test_rows_follow_the_header_in_order(tmp_path):
+    lines = _write(tmp_path / 'log.csv', chunk_rows=64).splitlines()
+    assert lines[0] == ','.join(COLUMNS)
+    assert lines[1:] == [','.join(str(x) for x in row) for row in ROWS]
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 64, 4096])
+def test_background_writer_writes_the_same_file(tmp_path, chunk_rows):
+    foreground = _write(tmp_path / 'fg.csv', chunk_rows=chunk_rows)
+    background = _write(tmp_path / 'bg.csv', chunk_rows=chunk_rows,
+                        background=True)
+    assert background == foreground
+
+
+def test_close_flushes_once_and_stops_the_worker(tmp_path):
+    path = tmp_path / 'log.csv'
+    log = Logger(str(path), chunk_rows=100, background=True)
+    log.write_header(COLUMNS)
+    log.write_row(ROWS[0])
+    log.close()
+    log.close()
+    assert not log.worker.is_alive()
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_background_write_errors_are_raised(tmp_path):
+    log = Logger(str(tmp_path / 'log.csv'), chunk_rows=1, background=True)
+    log.write_header(COLUMNS)
+    failed = threading.Event()
+
+    def fail(rows):
+        failed.set()
+        raise OSError('disk full')
+    log._write_rows = fail
+    log.write_row(ROWS[0])
+    failed.wait(5)
+    with pytest.raises(OSError):
+        log.close()
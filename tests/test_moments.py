@@ -0,0 +1,96 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from moments import QuantileSketch, RunningMoments, t_quantile
+
+
+def _data(n=1000, seed=3):
+    rng = random.Random(seed)
+    return [rng.expovariate(0.2) for _ in range(n)]
+
+
+def test_running_moments_match_two_pass_statistics():
+    data = _data()
+    moments = RunningMoments()
+    for x in data:
+        moments.add(x)
+    assert moments.count == len(data)
+    assert moments.mean == pytest.approx(np.mean(data))
+    assert moments.variance() == pytest.approx(np.var(data, ddof=1))
+
+
+@pytest.mark.parametrize('cuts', [[0, 1000], [0, 1, 1000], [0, 300, 301, 1000],
+                                  [0, 0, 500, 1000]])
+def test_merged_moments_match_one_pass(cuts):
+    data = _data()
+    whole = RunningMoments()
+    for x in data:
+        whole.add(x)
+    merged = RunningMoments()
+    for start, end in zip(cuts, cuts[1:]):
+        part = RunningMoments()
+        for x in data[start:end]:
+            part.add(x)
+        merged.merge(part)
+    assert merged.count == whole.count
+    assert merged.mean == pytest.approx(whole.mean)
+    assert merged.m2 == pytest.approx(whole.m2)
+
+
+def test_moments_track_arrays_element_wise():
+    rows = np.arange(12.0).reshape(4, 3) ** 2
+    moments = RunningMoments()
+    for row in rows:
+        moments.add(row)
+    np.testing.assert_allclose(moments.mean, rows.mean(axis=0))
+    np.testing.assert_allclose(moments.variance(), rows.var(axis=0, ddof=1))
+
+
+def test_half_width_uses_student_t():
+    moments = RunningMoments()
+    for x in [1.0, 2.0, 4.0]:
+        moments.add(x)
+    expected = 4.302653 * (moments.variance() / 3) ** 0.5
+    assert moments.half_width(0.95) == pytest.approx(expected, rel=1e-6)
+    assert math.isinf(RunningMoments().half_width())
+
+
+@pytest.mark.parametrize('p, df, expected', [(0.975, 1, 12.706205),
+                                             (0.975, 10, 2.228139),
+                                             (0.95, 30, 1.697261)])
+def test_t_quantile(p, df, expected):
+    assert t_quantile(p, df) == pytest.approx(expected, rel=1e-6)
+    assert t_quantile(1 - p, df) == pytest.approx(-expected, rel=1e-6)
+
+
+@pytest.mark.parametrize('q', [0.05, 0.25, 0.5, 0.9, 0.99])
+def test_sketch_quantiles_are_within_the_relative_accuracy(q):
+    data = _data(5000)
+    sketch = QuantileSketch(accuracy=0.01)
+    for x in data:
+        sketch.add(x)
+    exact = sorted(data)[int(q * (len(data) - 1))]
+    assert sketch.quantile(q) == pytest.approx(exact, rel=0.01)
+
+
+def test_merged_sketches_equal_one_sketch():
+    data = _data() + [0.0] * 10
+    whole = QuantileSketch()
+    halves = [QuantileSketch(), QuantileSketch()]
+    for n, x in enumerate(data):
+        whole.add(x)
+        halves[n % 2].add(x)
+    merged = halves[0].merge(halves[1])
+    assert (merged.buckets, merged.zeros, merged.count) == \
+        (whole.buckets, whole.zeros, whole.count)
+
+
+def test_sketch_rejects_negative_values_and_other_accuracies():
+    with pytest.raises(ValueError):
+        QuantileSketch().add(-1.0)
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.02))
+    assert math.isnan(QuantileSketch().quantile(0.5))
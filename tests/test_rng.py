@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from rng import AntitheticRandom, ExpSampler, generate_exp
+
+
+def test_antithetic_random_is_mirrored():
+    plain, mirrored = random.Random(3), AntitheticRandom(3)
+    for _ in range(1000):
+        assert mirrored.random() == 1.0 - plain.random()
+
+
+def test_antithetic_choice_is_mirrored_and_in_step():
+    plain, mirrored = random.Random(5), AntitheticRandom(5)
+    items = ['a', 'b', 'c']
+    for _ in range(1000):
+        assert mirrored.choice(items) == items[2 - items.index(
+            plain.choice(items))]
+        # Interleaved uniforms stay paired after the integer draws
+        assert mirrored.random() == 1.0 - plain.random()
+    assert mirrored.getstate() == plain.getstate()
+
+
+@pytest.mark.parametrize('block_size', [1, 7, 4096])
+def test_exp_sampler_matches_generate_exp(block_size):
+    plain = random.Random(11)
+    sampler = ExpSampler(random.Random(11), block_size=block_size)
+    rates = [0.1, 2.0, 0.0965, 1.0]
+    for n in range(3000):
+        L = rates[n % len(rates)]
+        assert sampler.sample(L) == pytest.approx(generate_exp(L, plain),
+                                                  rel=1e-12)
+
+
+def test_antithetic_exp_sampler_matches_generate_exp():
+    mirrored = AntitheticRandom(11)
+    sampler = ExpSampler(AntitheticRandom(11), block_size=64)
+    for _ in range(500):
+        assert sampler.sample(0.5) == pytest.approx(
+            generate_exp(0.5, mirrored), rel=1e-12)
@@ -0,0 +1,94 @@
+from component import ComponentType, ProductType
+from inspector import Inspector
+from routing import OutputPolicy
+from workstation import Workstation
+
+C1 = ComponentType.C1
+
+
+def _inspector(policy, capacities):
+    """
+    An inspector routing C1 to one workstation per capacity, with buffer
+    changes forwarded to its policy as the System does.
+    """
+    workstations = [Workstation(None, f'WS{k + 1}', 1.0, [C1], ProductType.P1,
+                                capacities={C1: capacity})
+                    for k, capacity in enumerate(capacities)]
+    inspector = Inspector(None, 'IN1', {C1: 1.0}, [C1], workstations, policy)
+    for w in workstations:
+        w.buffers[C1].monitor = inspector.router.buffer_changed
+    return inspector, workstations
+
+
+def _push(inspector, w):
+    w.buffers[C1].enqueue(C1)
+    inspector.router.chosen(C1, w)
+
+
+def test_shortest_queue_skips_full_buffers_with_unequal_capacities():
+    inspector, (ws1, ws2) = _inspector(OutputPolicy.SHORTEST_QUEUE, [2, 4])
+    for w in (ws1, ws1, ws2, ws2):
+        _push(inspector, w)
+    # WS1 is full at 2/2 and ties with WS2 at 2/4, which still has room
+    assert inspector.choose_output() is ws2
+    _push(inspector, ws2)
+    _push(inspector, ws2)
+    assert inspector.choose_output() is None
+    ws1.buffers[C1].dequeue()
+    assert inspector.choose_output() is ws1
+
+
+def test_shortest_queue_prefers_shorter_then_lower_id():
+    inspector, (ws1, ws2, ws3) = _inspector(OutputPolicy.SHORTEST_QUEUE,
+                                            [3, 3, 3])
+    assert inspector.choose_output() is ws1
+    _push(inspector, ws1)
+    assert inspector.choose_output() is ws2
+    _push(inspector, ws2)
+    _push(inspector, ws3)
+    _push(inspector, ws3)
+    assert inspector.choose_output() is ws1
+
+
+def test_round_robin_takes_turns():
+    inspector, workstations = _inspector(OutputPolicy.ROUND_ROBIN, [10] * 3)
+    order = list()
+    for _ in range(7):
+        w = inspector.choose_output()
+        order.append(w.id)
+        _push(inspector, w)
+    assert order == ['WS1', 'WS2', 'WS3', 'WS1', 'WS2', 'WS3', 'WS1']
+
+
+def test_round_robin_skips_full_buffers_and_moves_on_past_them():
+    inspector, (ws1, ws2, ws3) = _inspector(OutputPolicy.ROUND_ROBIN,
+                                            [2, 1, 2])
+    _push(inspector, ws1)
+    _push(inspector, ws2)
+    assert inspector.choose_output() is ws3
+    _push(inspector, ws3)
+    assert inspector.choose_output() is ws1
+    _push(inspector, ws1)
+    # It is WS2's turn, but WS2 is full
+    assert inspector.choose_output() is ws3
+    _push(inspector, ws3)
+    assert inspector.choose_output() is None
+
+
+def test_naive_takes_the_first_buffer_with_room():
+    inspector, (ws1, ws2) = _inspector(OutputPolicy.NAIVE, [1, 1])
+    assert inspector.choose_output() is ws1
+    _push(inspector, ws1)
+    assert inspector.choose_output() is ws2
+    _push(inspector, ws2)
+    assert inspector.choose_output() is None
+
+
+def test_round_robin_state_round_trips():
+    inspector, (ws1, ws2, ws3) = _inspector(OutputPolicy.ROUND_ROBIN,
+                                            [10] * 3)
+    _push(inspector, ws1)
+    state = inspector.router.get_state()
+    copy, workstations = _inspector(OutputPolicy.ROUND_ROBIN, [10] * 3)
+    copy.router.set_state(state)
+    assert copy.choose_output() is workstations[1]
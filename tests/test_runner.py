@@ -0,0 +1,38 @@
+import pytest
+
+from runner import PrecisionReport, ReplicationRunner
+
+
+def _summary(replication, value):
+    return {'replication': replication, 'throughput_P1': value}
+
+
+def test_antithetic_pairs_are_averaged_into_one_sample():
+    report = PrecisionReport(['throughput_*'], 0.1, paired=True)
+    # Results arrive in completion order, so pairs may be interleaved
+    for replication, value in [(1, 3.0), (2, 10.0), (0, 1.0), (3, 14.0)]:
+        report.add(_summary(replication, value))
+    moments = report.moments['throughput_P1']
+    assert (report.count, report.replications) == (2, 4)
+    assert moments.mean == pytest.approx(7.0)
+    assert moments.variance() == pytest.approx((12.0 - 2.0) ** 2 / 2)
+
+
+def test_absolute_precision_accepts_kpis_with_mean_near_zero():
+    values = [0.0, 0.0002, 0.0, 0.0001, 0.0, 0.0003]
+    strict = PrecisionReport(['throughput_*'], 0.05)
+    lenient = PrecisionReport(['throughput_*'], 0.05, absolute=0.001)
+    for replication, value in enumerate(values):
+        strict.add(_summary(replication, value))
+        lenient.add(_summary(replication, value))
+    assert not strict.met()
+    assert lenient.met()
+
+
+def test_sequential_antithetic_batches_keep_pairs_together():
+    runner = ReplicationRunner(workers=1, master_seed=1, event_log=False,
+                               antithetic=True)
+    batches = list(runner.run_sequential(1e-9, batch=3, max_replications=9))
+    ids = [[r['replication'] for r in results] for results, _ in batches]
+    assert ids == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert batches[-1][1].count == 4
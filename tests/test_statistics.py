@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from statistics import LogBinner, LogSummary, binned_series, summarize_logs
+
+
+def _log(seed, rows=500, duration=100.0):
+    """
+    A synthetic per-event log: sorted event times and cumulative counters.
+    """
+    rng = np.random.default_rng(seed)
+    times = np.sort(rng.uniform(0, duration, rows))
+    return pd.DataFrame({
+        'time': times,
+        'total_P1': np.cumsum(rng.integers(0, 2, rows)),
+        'blocked_I1': np.cumsum(rng.exponential(0.1, rows)),
+    })
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 7, 64, 500])
+def test_binning_in_chunks_matches_one_pass(chunk_rows):
+    df = _log(0)
+    columns = ['total_P1', 'blocked_I1']
+    whole = binned_series(df, columns, bin_width=10, duration=100)
+    binner = LogBinner(columns, bin_width=10, duration=100)
+    for start in range(0, len(df), chunk_rows):
+        binner.add(df.iloc[start:start + chunk_rows])
+    np.testing.assert_allclose(binner.diffs(), whole.to_numpy())
+    np.testing.assert_allclose(binner.final, df[columns].iloc[-1])
+
+
+def test_bins_hold_the_change_within_each_bin():
+    df = pd.DataFrame({'time': [1.0, 4.0, 12.0, 18.0, 19.0, 35.0],
+                       'total_P1': [1, 2, 3, 5, 6, 7]})
+    series = binned_series(df, ['total_P1'], bin_width=10, duration=40)
+    assert series['total_P1'].tolist() == [1, 3, 0, 0]
+    assert series.index.tolist() == [0, 10, 20, 30]
+
+
+def _summary(seeds, columns=('total_P1', 'blocked_I1')):
+    summary = None
+    for seed in seeds:
+        binner = LogBinner(columns, bin_width=10, duration=100)
+        binner.add(_log(seed))
+        if summary is None:
+            summary = LogSummary(binner.columns, binner.edges, 100)
+        summary.add(binner)
+    return summary
+
+
+def test_merged_summaries_match_one_pass():
+    whole = _summary(range(6))
+    merged = _summary([4, 5]).merge(_summary([0])).merge(_summary([1, 2, 3]))
+    pd.testing.assert_frame_equal(merged.to_frame(), whole.to_frame(),
+                                  check_exact=False, rtol=1e-9)
+
+
+def test_summarize_logs_merges_every_file(tmp_path):
+    paths = list()
+    for seed in range(4):
+        path = tmp_path / f'log{seed}.csv'
+        _log(seed).to_csv(path, index=False)
+        paths.append(str(path))
+    table = summarize_logs(paths, bin_width=10, duration=100, chunk_rows=50)
+    expected = _summary(range(4)).to_frame()
+    pd.testing.assert_frame_equal(table.to_frame(), expected,
+                                  check_exact=False, rtol=1e-9)
+    throughput = expected.set_index('name').loc['throughput_P1', 'mean']
+    totals = [_log(seed)['total_P1'].iloc[-1] for seed in range(4)]
+    assert throughput == pytest.approx(np.mean(totals) / 100)
+
+
+def test_summaries_of_different_logs_do_not_merge():
+    with pytest.raises(ValueError):
+        _summary([0]).merge(_summary([1], columns=['total_P1']))
@@ -0,0 +1,44 @@
+from collections import Counter
+
+from config import default_spec
+from sweep import Sweep, grid_design, latin_hypercube
+
+
+def test_integer_range_gives_valid_capacities():
+    design = latin_hypercube({'buffer_capacity': [1, 4],
+                              'workstations.WS1.lambda': [0.1, 0.3]},
+                             40, seed=1)
+    for point in design:
+        assert isinstance(point['buffer_capacity'], int)
+        default_spec().with_overrides(point)
+    # Each integer level gets an equal share of the points
+    counts = Counter(point['buffer_capacity'] for point in design)
+    assert counts == {1: 10, 2: 10, 3: 10, 4: 10}
+
+
+def test_float_range_stays_continuous():
+    design = latin_hypercube({'workstations.WS1.lambda': [0.1, 0.3]}, 10,
+                             seed=2)
+    strata = sorted(int((p['workstations.WS1.lambda'] - 0.1) / 0.02)
+                    for p in design)
+    assert strata == list(range(10))
+
+
+def test_write_results_without_results_writes_the_header(tmp_path):
+    path = tmp_path / 'sweep.csv'
+    design = grid_design({'buffer_capacity': [1, 2]})
+    sweep = Sweep(default_spec(), design, 0, workers=1, master_seed=1)
+    sweep.write_results(path, list(sweep.run()))
+    assert path.read_text().splitlines() == [
+        'point,buffer_capacity,replication']
+
+
+def test_write_results_has_a_row_per_replication(tmp_path):
+    path = tmp_path / 'sweep.csv'
+    design = grid_design({'buffer_capacity': [1, 2]})
+    sweep = Sweep(default_spec(), design, 2, workers=1, master_seed=1)
+    sweep.write_results(path, list(sweep.run()))
+    lines = path.read_text().splitlines()
+    assert lines[0].startswith('point,buffer_capacity,replication,')
+    assert [line.split(',')[:3] for line in lines[1:]] == [
+        ['0', '1', '0'], ['0', '1', '1'], ['1', '2', '0'], ['1', '2', '1']]
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from config import default_spec, load_spec
+from system import System
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
+
+
+@pytest.mark.parametrize('routing', ['NAIVE', 'SHORTEST_QUEUE', 'ROUND_ROBIN'])
+@pytest.mark.parametrize('seed', range(5))
+def test_blocked_time_matches_blocked_fraction(seed, routing):
+    spec = default_spec().with_overrides({'inspectors.IN1.routing': routing})
+    system = System(0, master_seed=seed, spec=spec)
+    system.run()
+    result = system.summary()
+    for ins in system.inspectors:
+        assert result[f'blocked_{ins.id}'] == pytest.approx(
+            result[f'blocked_fraction_{ins.id}'] * spec.end_time, abs=1e-9)
+
+
+def test_shortest_queue_model_uses_the_larger_buffers():
+    # IN1 sped up so the C1 buffers fill; with unequal capacities it should
+    # only block once every C1 buffer is full
+    spec = load_spec(os.path.join(MODELS_DIR, 'shortest_queue.toml'))
+    spec = spec.with_overrides({'inspectors.IN1.lambdas.C1': 2.0})
+    system = System(0, master_seed=0, spec=spec)
+    longest = 0
+    for state in system.snapshots([t / 2 for t in range(1, 2001)]):
+        longest = max(longest, state['WS2_C1_Q'], state['WS3_C1_Q'])
+        if state['IN1_is_blocked']:
+            assert (state['WS1_C1_Q'], state['WS2_C1_Q'],
+                    state['WS3_C1_Q']) == (2, 4, 4)
+    assert longest == 4
+
+
+@pytest.mark.parametrize('name', sorted(
+    n for n in os.listdir(MODELS_DIR) if not n.startswith('sweep')))
+def test_bundled_models_load_and_run(name):
+    spec = load_spec(os.path.join(MODELS_DIR, name))
+    System(0, master_seed=0, spec=spec).run()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_warmup_truncates_every_summary_value(seed):
+    warmup = 300.0
+    system = System(0, master_seed=seed, warmup=warmup)
+    system.run()
+    result = system.summary()
+    steady = system.spec.end_time - warmup
+    for ins in system.inspectors:
+        assert result[f'blocked_{ins.id}'] == pytest.approx(
+            result[f'blocked_fraction_{ins.id}'] * steady, abs=1e-9)
+    for p in system.model.products:
+        assert result[f'total_{p.name}'] == pytest.approx(
+            result[f'throughput_{p.name}'] * steady)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_vectorized_rng_gives_the_same_replication(seed):
+    plain = System(0, master_seed=seed)
+    plain.run()
+    vectorized = System(0, master_seed=seed, vectorized_rng=True)
+    vectorized.run()
+    assert vectorized.summary() == pytest.approx(plain.summary())
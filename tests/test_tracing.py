@@ -0,0 +1,89 @@
+import pytest
+
+from system import System
+from tracing import (ConsoleTraceSink, EveryNthTraceSink, FileTraceSink,
+                     TimeWindowTraceSink, TraceSink, make_trace_sink)
+
+
+class ListSink(TraceSink):
+
+    def __init__(self):
+        self.lines = list()
+        self.closed = False
+
+    def accepts(self, clock):
+        return True
+
+    def write(self, line):
+        self.lines.append(line)
+
+    def close(self):
+        self.closed = True
+
+
+def test_default_sink_accepts_nothing():
+    assert not make_trace_sink().accepts(0.0)
+
+
+def test_every_nth_keeps_the_first_of_every_n_events():
+    sink = EveryNthTraceSink(ListSink(), 3)
+    assert [sink.accepts(t) for t in range(7)] == \
+        [True, False, False, True, False, False, True]
+    with pytest.raises(ValueError):
+        EveryNthTraceSink(ListSink(), 0)
+
+
+def test_every_nth_only_counts_events_inside_the_window():
+    sink = EveryNthTraceSink(TimeWindowTraceSink(ListSink(), 10, 20), 2)
+    accepted = [t for t in range(30) if sink.accepts(t)]
+    assert accepted == [10, 12, 14, 16, 18, 20]
+
+
+def test_wrappers_write_to_and_close_the_inner_sink():
+    inner = ListSink()
+    sink = EveryNthTraceSink(TimeWindowTraceSink(inner, 0, 1), 2)
+    sink.write('line')
+    sink.close()
+    assert inner.lines == ['line']
+    assert inner.closed
+
+
+def test_make_trace_sink_builds_the_requested_chain(tmp_path):
+    path = tmp_path / 'trace.txt'
+    sink = make_trace_sink('file', str(path), every=4, window=(5, 50))
+    assert isinstance(sink, EveryNthTraceSink) and sink.n == 4
+    assert isinstance(sink.sink, TimeWindowTraceSink)
+    assert (sink.sink.start, sink.sink.end) == (5, 50)
+    assert isinstance(sink.sink.sink, FileTraceSink)
+    sink.close()
+    assert isinstance(make_trace_sink('console'), ConsoleTraceSink)
+    with pytest.raises(ValueError):
+        make_trace_sink('file')
+    with pytest.raises(ValueError):
+        make_trace_sink('printer')
+
+
+def test_file_sink_writes_lines_and_closes_once(tmp_path):
+    path = tmp_path / 'trace.txt'
+    sink = FileTraceSink(str(path))
+    sink.write('a')
+    sink.write('b')
+    sink.close()
+    sink.close()
+    assert path.read_text() == 'a\nb\n'
+
+
+def test_tracing_does_not_change_the_run(tmp_path):
+    plain = System(0, master_seed=4)
+    plain.run()
+    path = tmp_path / 'trace.txt'
+    sink = make_trace_sink('file', str(path), every=5, window=(100, 200))
+    traced = System(0, master_seed=4, trace=sink)
+    traced.run()
+    sink.close()
+    assert traced.summary() == plain.summary()
+    lines = path.read_text().splitlines()
+    assert lines[0] == 'Simulation Start'
+    times = [float(line.split()[1]) for line in lines
+             if line.startswith('Time:')]
+    assert times and all(100 <= t <= 200 for t in times)
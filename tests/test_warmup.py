@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from warmup import (mser_truncation, recommend_warmup, welch_average,
+                    welch_truncation)
+
+
+def _transient(n=200, settle=40, seed=5):
+    """
+    A series that climbs linearly from 0 to a level of 10 over `settle`
+    points, then stays there with a little noise.
+    """
+    rng = np.random.default_rng(seed)
+    ramp = np.minimum(np.arange(n) / settle, 1.0) * 10
+    return ramp + rng.normal(0, 0.2, n)
+
+
+def test_welch_average_uses_the_points_available_near_the_start():
+    series = np.arange(10.0)
+    smoothed = welch_average(series, 2)
+    assert len(smoothed) == 8
+    # Windows of 1, 3 and then 5 points, all centred, on a straight line
+    np.testing.assert_allclose(smoothed, series[:8])
+    np.testing.assert_allclose(welch_average([1, 5, 0, 2], 1),
+                               [1, 2, 7 / 3])
+
+
+def test_welch_truncation_finds_the_end_of_the_transient():
+    cut = welch_truncation(_transient(), window=5, tolerance=0.05)
+    assert 30 <= cut <= 40
+
+
+def test_mser_truncation_finds_the_end_of_the_transient():
+    cut = mser_truncation(_transient())
+    assert cut % 5 == 0
+    assert 30 <= cut <= 50
+
+
+def test_mser_keeps_a_stationary_series():
+    rng = np.random.default_rng(1)
+    assert mser_truncation(rng.normal(10, 1, 200)) <= 20
+
+
+def test_mser_deletes_at_most_half_the_run():
+    series = np.concatenate((np.zeros(60), np.full(40, 10.0)))
+    assert mser_truncation(series) <= 50
+
+
+def test_recommend_warmup_is_a_clock_time():
+    series = _transient()
+    assert recommend_warmup(series, 10, 'mser') == \
+        10 * mser_truncation(series)
+    assert recommend_warmup(series, 10, 'welch', 5, 0.05) == \
+        10 * welch_truncation(series, 5, 0.05)
+    with pytest.raises(ValueError):
+        recommend_warmup(series, 10, 'other')
+
+
+def test_short_or_unsettled_series_are_rejected():
+    with pytest.raises(ValueError):
+        welch_average(np.arange(3.0), 5)
+    with pytest.raises(ValueError):
+        mser_truncation(np.arange(7.0))
+    with pytest.raises(ValueError):
+        welch_truncation(np.exp(np.arange(50.0)), 2, 0.01)